@@ -3,49 +3,155 @@ Database module for County Health Explorer.
 Handles DuckDB connection with spatial extension.
 """
 
+import argparse
 import duckdb
 import logging
+import os
+import queue
+import threading
 from pathlib import Path
 from contextlib import contextmanager
-from typing import Optional, Generator
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Generator
+
+import numpy as np
 
 logger = logging.getLogger(__name__)
 
 
+# cgroup v2 and v1 files holding the container's memory limit
+_CGROUP_MEMORY_LIMIT_FILES = ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes")
+
+
+def _read_cgroup_file(path: str) -> Optional[str]:
+    """Contents of a cgroup control file, or None where it doesn't exist."""
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cpu_quota() -> Optional[int]:
+    """CPUs allowed by a cgroup v2 CPU quota (``cpu.max``), rounded up, if one is set."""
+    value = _read_cgroup_file("/sys/fs/cgroup/cpu.max")
+    try:
+        quota, period = value.split()
+        return max(1, -(-int(quota) // int(period)))
+    except (AttributeError, ValueError, ZeroDivisionError):
+        # No cgroup v2, or "max" (no quota)
+        return None
+
+
+def _default_threads() -> int:
+    """Default DuckDB thread count: the CPUs this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    
+    quota = _cpu_quota()
+    return min(cpus, quota) if quota else cpus
+
+
+def _available_memory() -> Optional[int]:
+    """
+    Memory available for new allocations, in bytes, if known.
+    
+    Uses ``MemAvailable`` from /proc/meminfo, which counts reclaimable page
+    cache (unlike free memory, which drops once data files have been read),
+    falling back to total physical memory where /proc/meminfo doesn't exist.
+    Both describe the whole host, so a container's cgroup memory limit caps
+    the result.
+    """
+    candidates = []
+    
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    candidates.append(int(line.split()[1]) * 1024)
+                    break
+    except (OSError, ValueError, IndexError):
+        pass
+    
+    if not candidates:
+        try:
+            candidates.append(os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE"))
+        except (AttributeError, ValueError, OSError):
+            # Not available on this platform
+            pass
+    
+    for path in _CGROUP_MEMORY_LIMIT_FILES:
+        value = _read_cgroup_file(path)
+        # "max" (v2) means no limit; v1 reports "no limit" as a huge number
+        if value and value.isdigit():
+            candidates.append(int(value))
+    
+    return min(candidates) if candidates else None
+
+
+def _default_memory_limit() -> Optional[str]:
+    """Default DuckDB memory limit: 70% of available RAM, if known."""
+    available = _available_memory()
+    if available is None:
+        # Keep DuckDB's own default
+        return None
+    
+    return f"{int(available * 0.7 / 2**20)}MB"
+
+
 class DatabaseManager:
     """Manages DuckDB database connection with spatial extension."""
     
-    def __init__(self, db_path: Optional[str] = None):
+    def __init__(self, db_path: Optional[str] = None, pool_size: int = 8):
         """
         Initialize database manager.
         
         Args:
             db_path: Path to DuckDB database file. If None, uses in-memory database.
+            pool_size: Maximum number of idle cursors kept for reuse.
         """
         self.db_path = db_path or ":memory:"
         self._connection: Optional[duckdb.DuckDBPyConnection] = None
+        self._connection_lock = threading.Lock()
+        self._cursor_pool: "queue.LifoQueue[duckdb.DuckDBPyConnection]" = queue.LifoQueue(maxsize=pool_size)
         
     def get_connection(self) -> duckdb.DuckDBPyConnection:
         """Get or create database connection with spatial extension."""
         if self._connection is None:
-            logger.info(f"Creating DuckDB connection to {self.db_path}")
-            self._connection = duckdb.connect(self.db_path)
-            self._setup_spatial_extension()
-            self._configure_performance()
+            with self._connection_lock:
+                if self._connection is None:
+                    logger.info(f"Creating DuckDB connection to {self.db_path}")
+                    self._connection = duckdb.connect(self.db_path)
+                    self._setup_spatial_extension()
+                    self._configure_performance()
             
         return self._connection
     
     def _setup_spatial_extension(self):
-        """Install and load spatial extension."""
+        """Install and load spatial extension, skipping steps already done."""
         try:
             logger.info("Setting up DuckDB spatial extension")
             conn = self._connection
             
-            # Install spatial extension if not already installed
-            conn.execute("INSTALL spatial;")
+            # Let DuckDB load already-installed extensions on demand for ST_* calls;
+            # installing stays explicit below so nothing is downloaded at query time
+            conn.execute("SET autoload_known_extensions = true;")
+            
+            result = conn.execute("""
+                SELECT installed, loaded FROM duckdb_extensions()
+                WHERE extension_name = 'spatial'
+            """).fetchone()
+            installed, loaded = result if result else (False, False)
+            
+            # Install spatial extension only if it is not already on disk
+            if not installed:
+                conn.execute("INSTALL spatial;")
             
-            # Load spatial extension
-            conn.execute("LOAD spatial;")
+            # Load spatial extension only if it is not already loaded
+            if not loaded:
+                conn.execute("LOAD spatial;")
             
             logger.info("Spatial extension loaded successfully")
             
@@ -54,49 +160,103 @@ class DatabaseManager:
             raise
     
     def _configure_performance(self):
-        """Configure DuckDB for optimal performance."""
+        """Configure DuckDB threads and memory limit for the current host."""
         try:
             conn = self._connection
             
-            # Set thread count
-            conn.execute("SET threads = 4;")
+            # Set thread count (DUCKDB_THREADS overrides the CPU count)
+            threads = os.environ.get("DUCKDB_THREADS") or _default_threads()
+            conn.execute(f"SET threads = {int(threads)};")
             
-            # Set memory limit (4GB)
-            conn.execute("SET memory_limit = '4GB';")
+            # Set memory limit (DUCKDB_MEMORY_LIMIT overrides 70% of available RAM)
+            memory_limit = os.environ.get("DUCKDB_MEMORY_LIMIT") or _default_memory_limit()
+            if memory_limit:
+                conn.execute(f"SET memory_limit = '{memory_limit}';")
             
-            logger.info("Database performance configuration applied")
+            logger.info(f"Database performance configuration applied (threads={threads}, memory_limit={memory_limit or 'default'})")
             
         except Exception as e:
             logger.warning(f"Failed to configure performance settings: {e}")
     
     @contextmanager
     def get_cursor(self) -> Generator[duckdb.DuckDBPyConnection, None, None]:
-        """Context manager for database operations."""
-        conn = self.get_connection()
+        """
+        Context manager for database operations.
+        
+        Yields a cursor on the shared database. Each cursor has its own
+        transaction state, so concurrent requests can query in parallel.
+        Cursors are returned to a pool for reuse unless the block raised.
+        """
+        cursor = self._acquire_cursor()
         try:
-            yield conn
+            yield cursor
         except Exception as e:
             logger.error(f"Database operation failed: {e}")
+            # Don't hand a cursor in an unknown transaction state to the next caller
+            cursor.close()
+            cursor = None
             raise
         finally:
-            # Connection cleanup is handled by DuckDB automatically
-            pass
+            if cursor is not None:
+                self._release_cursor(cursor)
+    
+    def _acquire_cursor(self) -> duckdb.DuckDBPyConnection:
+        """Take an idle cursor from the pool, or create a new one."""
+        try:
+            return self._cursor_pool.get_nowait()
+        except queue.Empty:
+            return self.get_connection().cursor()
+    
+    def _release_cursor(self, cursor: duckdb.DuckDBPyConnection):
+        """Return a cursor to the pool, closing it if the pool is full."""
+        try:
+            self._cursor_pool.put_nowait(cursor)
+        except queue.Full:
+            cursor.close()
+    
+    def query_columns(self, sql: str, params: Optional[List[Any]] = None) -> Dict[str, np.ndarray]:
+        """
+        Run a query and return its result as NumPy arrays keyed by column name.
+        
+        Results are transferred column by column, avoiding a Python tuple per row.
+        """
+        with self.get_cursor() as conn:
+            return conn.execute(sql, params or []).fetchnumpy()
     
     def close(self):
-        """Close database connection."""
+        """Close pooled cursors and the database connection."""
+        while True:
+            try:
+                self._cursor_pool.get_nowait().close()
+            except queue.Empty:
+                break
+        
         if self._connection:
             self._connection.close()
             self._connection = None
             logger.info("Database connection closed")
     
-    def test_spatial_functionality(self) -> bool:
-        """Test if spatial functionality is working."""
+    def test_spatial_functionality(self, deep_check: bool = False) -> bool:
+        """
+        Test if spatial functionality is working.
+        
+        Args:
+            deep_check: Also build a geometry to exercise the spatial engine.
+                By default only checks that the extension is loaded, which keeps
+                app startup fast.
+        """
         try:
             with self.get_cursor() as conn:
-                # Test basic spatial function
-                result = conn.execute("""
-                    SELECT ST_GeomFromText('POINT(0 0)') as geom
-                """).fetchone()
+                if deep_check:
+                    # Test basic spatial function
+                    result = conn.execute("""
+                        SELECT ST_GeomFromText('POINT(0 0)') as geom
+                    """).fetchone()
+                else:
+                    result = conn.execute("""
+                        SELECT extension_name FROM duckdb_extensions()
+                        WHERE extension_name = 'spatial' AND loaded
+                    """).fetchone()
                 
                 if result:
                     logger.info("Spatial functionality test passed")
@@ -108,34 +268,38 @@ class DatabaseManager:
         return False
 
 
-# Global database manager instance
-import os
-db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "county_health.duckdb")
-db_manager = DatabaseManager(db_path)
+# Default database file
+DB_PATH = Path(__file__).resolve().parents[2] / "data" / "county_health.duckdb"
 
 
+@lru_cache(maxsize=1)
 def get_db() -> DatabaseManager:
-    """Get the global database manager instance."""
-    return db_manager
+    """Get the global database manager instance, creating it on first use."""
+    return DatabaseManager(str(DB_PATH))
 
 
-def init_database():
+def init_database(deep_check: bool = False):
     """Initialize database and test functionality."""
     logger.info("Initializing database")
     
     db = get_db()
     
     # Test connection and spatial functionality
-    if not db.test_spatial_functionality():
+    if not db.test_spatial_functionality(deep_check=deep_check):
         raise RuntimeError("Failed to initialize spatial functionality")
     
     logger.info("Database initialized successfully")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Test the County Health Explorer database setup")
+    parser.add_argument("--deep-check", action="store_true",
+                        help="Run a geometry smoke test instead of only checking the extension is loaded")
+    args = parser.parse_args()
+    
     # Test the database setup
     logging.basicConfig(level=logging.INFO)
-    init_database()
+    init_database(deep_check=args.deep_check)
     
     # Test basic operations
     db = get_db()
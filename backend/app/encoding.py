@@ -0,0 +1,20 @@
+"""
+HTTP content-coding helpers shared by the API and the frontend dev server.
+
+Kept free of third-party imports so serve_frontend.py can use them without
+loading the backend.
+"""
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Check whether an Accept-Encoding header allows gzip."""
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() == "gzip":
+            quality = params.replace(" ", "").lower().removeprefix("q=")
+            try:
+                return not params or float(quality) > 0
+            except ValueError:
+                return True
+    
+    return False
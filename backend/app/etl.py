@@ -3,10 +3,13 @@ ETL Pipeline for County Health Explorer.
 Loads county health data and spatial geometries into DuckDB.
 """
 
+import hashlib
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Generator, Optional
 import pandas as pd
 import geopandas as gpd
 import duckdb
@@ -15,6 +18,21 @@ from .database import get_db, DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+# Data dictionary describing the health CSV columns, next to the CSV
+DATA_DICTIONARY_FILE = "DataDictionary_2025.csv"
+
+# Simplification tolerance (degrees) for geometries served to the map
+SIMPLIFY_TOLERANCE = 0.01
+
+
+def _file_sha256(path: Path) -> str:
+    """Compute the SHA-256 hex digest of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
 
 class CountyHealthETL:
     """ETL pipeline for county health and spatial data."""
@@ -27,13 +45,16 @@ class CountyHealthETL:
             db_manager: Database manager instance. If None, uses global instance.
         """
         self.db = db_manager or get_db()
+        self._open_transactions = set()
         
-    def load_county_health_data(self, csv_path: str) -> int:
+    def load_county_health_data(self, csv_path: str, conn: Optional[duckdb.DuckDBPyConnection] = None) -> int:
         """
         Load county health data from CSV into DuckDB.
         
         Args:
             csv_path: Path to the county health CSV file
+            conn: Connection to load through, joining its open transaction.
+                If None, a cursor and transaction of its own are used.
             
         Returns:
             Number of rows loaded
@@ -41,12 +62,32 @@ class CountyHealthETL:
         logger.info(f"Loading county health data from {csv_path}")
         
         try:
-            with self.db.get_cursor() as conn:
-                # Use DuckDB's read_csv_auto function for efficient loading
-                conn.execute(f"""
-                    CREATE OR REPLACE TABLE county_health AS 
-                    SELECT * FROM read_csv_auto('{csv_path}', header=true)
-                """)
+            with self._cursor(conn) as conn:
+                if self._source_unchanged(conn, 'county_health', csv_path):
+                    logger.info(f"{csv_path} unchanged since last load, skipping")
+                else:
+                    # Use an explicit schema so DuckDB can skip sniffing and parse in parallel
+                    columns = self._get_csv_columns(conn, csv_path)
+                    columns_sql = ", ".join(
+                        f"'{self._quote_literal(name)}': '{col_type}'" for name, col_type in columns.items()
+                    )
+                    
+                    # Add a plain fips_code join key and store rows in FIPS order so
+                    # zonemaps can prune state-prefix filters
+                    with self._transaction(conn):
+                        conn.execute(f"""
+                            CREATE OR REPLACE TABLE county_health AS 
+                            SELECT "5-digit FIPS Code" AS fips_code, *
+                            FROM read_csv('{csv_path}', header=true, parallel=true,
+                                          auto_detect=false, columns={{{columns_sql}}})
+                            ORDER BY fips_code
+                        """)
+                        self._record_source(conn, 'county_health', csv_path)
+                        
+                        conn.execute("""
+                            CREATE INDEX idx_health_fips 
+                            ON county_health (fips_code)
+                        """)
                 
                 # Get row count
                 result = conn.execute("SELECT COUNT(*) FROM county_health").fetchone()
@@ -59,12 +100,175 @@ class CountyHealthETL:
             logger.error(f"Failed to load county health data: {e}")
             raise
     
-    def load_spatial_data(self, geojson_path: str) -> int:
+    def _get_csv_columns(self, conn: duckdb.DuckDBPyConnection, csv_path: str) -> Dict[str, str]:
+        """
+        Get the column schema for a CSV, using a cached JSON sidecar when possible.
+        
+        The schema is detected once with ``read_csv_auto`` over the full file and
+        written next to the CSV as ``<csv>.schema.json``. The cache is keyed on
+        the CSV's size and modification time so edited files are re-detected.
+        
+        Args:
+            conn: Database connection used for detection
+            csv_path: Path to the CSV file
+            
+        Returns:
+            Ordered mapping of column name to DuckDB type
+        """
+        csv_stat = Path(csv_path).stat()
+        schema_path = Path(f"{csv_path}.schema.json")
+        
+        if schema_path.exists():
+            try:
+                cached = json.loads(schema_path.read_text())
+                if cached.get('size') == csv_stat.st_size and cached.get('mtime') == csv_stat.st_mtime:
+                    return cached['columns']
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Ignoring unreadable CSV schema cache {schema_path}: {e}")
+        
+        logger.info(f"Detecting CSV schema for {csv_path}")
+        result = conn.execute(f"""
+            DESCRIBE SELECT * FROM read_csv_auto('{csv_path}', header=true, sample_size=-1)
+        """).fetchall()
+        columns = {row[0]: row[1] for row in result}
+        
+        try:
+            schema_path.write_text(json.dumps({
+                'size': csv_stat.st_size,
+                'mtime': csv_stat.st_mtime,
+                'columns': columns
+            }))
+        except OSError as e:
+            logger.warning(f"Could not write CSV schema cache {schema_path}: {e}")
+        
+        return columns
+    
+    @contextmanager
+    def _cursor(self, conn: Optional[duckdb.DuckDBPyConnection] = None) -> Generator[duckdb.DuckDBPyConnection, None, None]:
+        """Yield the given connection, or a pooled cursor if none was given."""
+        if conn is not None:
+            yield conn
+        else:
+            with self.db.get_cursor() as cursor:
+                yield cursor
+    
+    @contextmanager
+    def _transaction(self, conn: duckdb.DuckDBPyConnection) -> Generator[None, None, None]:
+        """
+        Run the enclosed statements in one transaction, rolling back on failure.
+        
+        Nested use on a connection that is already in a transaction joins the
+        outer transaction, which then commits or rolls back everything.
+        """
+        if id(conn) in self._open_transactions:
+            yield
+            return
+        
+        conn.execute("BEGIN TRANSACTION")
+        self._open_transactions.add(id(conn))
+        try:
+            yield
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            self._open_transactions.discard(id(conn))
+    
+    def _source_unchanged(self, conn: duckdb.DuckDBPyConnection, table_name: str, source_path: str) -> bool:
+        """
+        Check whether a table was last loaded from this exact source file.
+        
+        The file's size and mtime are compared with those recorded in
+        ``etl_metadata``; if they differ, the SHA-256 is compared instead so a
+        merely touched file is still treated as unchanged.
+        
+        Args:
+            conn: Database connection
+            table_name: Table the source file is loaded into
+            source_path: Path to the source file
+            
+        Returns:
+            True if the table exists and its recorded source matches the file
+        """
+        self._ensure_etl_metadata_table(conn)
+        
+        result = conn.execute("""
+            SELECT m.source_path, m.size, m.mtime, m.sha256
+            FROM etl_metadata m
+            JOIN duckdb_tables() t ON t.table_name = m.table_name
+            WHERE m.table_name = ?
+        """, [table_name]).fetchone()
+        
+        if not result:
+            return False
+        
+        recorded_path, size, mtime, sha256 = result
+        source = Path(source_path).resolve()
+        stat = source.stat()
+        
+        if recorded_path != str(source) or size != stat.st_size:
+            return False
+        
+        if mtime == stat.st_mtime:
+            return True
+        
+        if _file_sha256(source) == sha256:
+            conn.execute("UPDATE etl_metadata SET mtime = ? WHERE table_name = ?", [stat.st_mtime, table_name])
+            return True
+        
+        return False
+    
+    def _record_source(self, conn: duckdb.DuckDBPyConnection, table_name: str, source_path: str):
+        """Record the source file a table was loaded from in ``etl_metadata``."""
+        self._ensure_etl_metadata_table(conn)
+        
+        source = Path(source_path).resolve()
+        stat = source.stat()
+        
+        conn.execute("""
+            INSERT OR REPLACE INTO etl_metadata (table_name, source_path, size, mtime, sha256, loaded_at)
+            VALUES (?, ?, ?, ?, ?, current_timestamp)
+        """, [table_name, str(source), stat.st_size, stat.st_mtime, _file_sha256(source)])
+    
+    @staticmethod
+    def _ensure_etl_metadata_table(conn: duckdb.DuckDBPyConnection):
+        """Create the table tracking which source file each table was loaded from."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS etl_metadata (
+                table_name VARCHAR PRIMARY KEY,
+                source_path VARCHAR,
+                size BIGINT,
+                mtime DOUBLE,
+                sha256 VARCHAR,
+                loaded_at TIMESTAMP
+            )
+        """)
+    
+    @staticmethod
+    def _quote_literal(value: str) -> str:
+        """Escape a value for use inside a single-quoted SQL string literal."""
+        return value.replace("'", "''")
+    
+    def load_spatial_data(self, geojson_path: str, conn: Optional[duckdb.DuckDBPyConnection] = None) -> int:
         """
         Load county spatial data from GeoJSON into DuckDB.
         
+        The GeoJSON is read with the spatial extension's ``ST_Read`` so parsing
+        and geometry construction happen in a single vectorized scan. If
+        ``ST_Read`` cannot open the file, it is read with GeoPandas and
+        bulk-loaded through a registered DataFrame instead.
+        
+        An RTREE index is built on ``geometry`` once the table is populated. It
+        serves ``ST_Intersects``/``ST_Within``/``ST_Contains`` filters against
+        constant geometries; for proximity queries use ``ST_DWithin`` rather
+        than ``ST_Buffer`` + ``ST_Intersects``, which allocates a buffered
+        geometry per row and cannot use the index.
+        
         Args:
             geojson_path: Path to the counties GeoJSON file
+            conn: Connection to load through, joining its open transaction.
+                If None, a cursor and transaction of its own are used.
             
         Returns:
             Number of counties loaded
@@ -72,185 +276,242 @@ class CountyHealthETL:
         logger.info(f"Loading spatial data from {geojson_path}")
         
         try:
-            # Read GeoJSON file
-            with open(geojson_path, 'r') as f:
-                geojson_data = json.load(f)
-            
-            features = geojson_data.get('features', [])
-            logger.info(f"Found {len(features)} features in GeoJSON")
-            
-            # Process features and convert to format suitable for DuckDB
-            spatial_records = []
-            
-            for feature in features:
-                properties = feature.get('properties', {})
-                geometry = feature.get('geometry', {})
-                
-                # Extract key properties
-                fips_code = properties.get('GEOID', '')
-                county_name = properties.get('NAME', '')
-                state_fp = properties.get('STATEFP', '')
+            with self._cursor(conn) as conn:
+                if self._source_unchanged(conn, 'county_spatial', geojson_path):
+                    logger.info(f"{geojson_path} unchanged since last load, skipping")
+                    result = conn.execute("SELECT COUNT(*) FROM county_spatial").fetchone()
+                    return result[0] if result else 0
                 
-                # Convert geometry to WKT format for DuckDB spatial
-                geometry_wkt = self._geometry_to_wkt(geometry)
-                
-                if fips_code and geometry_wkt:
-                    spatial_records.append({
-                        'fips_code': fips_code,
-                        'county_name': county_name,
-                        'state_fp': state_fp,
-                        'geometry_wkt': geometry_wkt
-                    })
-            
-            # Load into DuckDB
-            with self.db.get_cursor() as conn:
-                # Create spatial table
-                conn.execute("""
-                    CREATE OR REPLACE TABLE county_spatial (
-                        fips_code VARCHAR,
-                        county_name VARCHAR,
-                        state_fp VARCHAR,
-                        geometry GEOMETRY
-                    )
-                """)
+                # Decide on the reader up front: a failed ST_Read would abort
+                # the transaction this load may be part of
+                use_st_read = self._st_read_supported(geojson_path)
+                if not use_st_read:
+                    logger.warning("ST_Read cannot open the file, falling back to Python GeoJSON parsing")
                 
-                # Insert spatial data
-                for record in spatial_records:
+                # Bulk load inside one transaction so the rows commit together
+                with self._transaction(conn):
+                    if use_st_read:
+                        self._create_spatial_table_st_read(conn, geojson_path)
+                    else:
+                        self._create_spatial_table_from_features(conn, geojson_path)
+                    self._record_source(conn, 'county_spatial', geojson_path)
+                    
+                    # Build indexes only once the table is fully populated, so
+                    # the RTREE is bulk-loaded; rebuild any stale index
+                    conn.execute("DROP INDEX IF EXISTS idx_county_spatial_geom")
                     conn.execute("""
-                        INSERT INTO county_spatial (fips_code, county_name, state_fp, geometry)
-                        VALUES (?, ?, ?, ST_GeomFromText(?))
-                    """, [
-                        record['fips_code'],
-                        record['county_name'], 
-                        record['state_fp'],
-                        record['geometry_wkt']
-                    ])
-                
-                # Create spatial index for performance
-                conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_county_spatial_geom 
-                    ON county_spatial USING RTREE (geometry)
-                """)
+                        CREATE INDEX idx_county_spatial_geom 
+                        ON county_spatial USING RTREE (geometry)
+                    """)
+                    
+                    # Create index on FIPS code for joins
+                    conn.execute("DROP INDEX IF EXISTS idx_county_spatial_fips")
+                    conn.execute("""
+                        CREATE INDEX idx_county_spatial_fips 
+                        ON county_spatial (fips_code)
+                    """)
                 
-                # Create index on FIPS code for joins
-                conn.execute("""
-                    CREATE INDEX IF NOT EXISTS idx_county_spatial_fips 
-                    ON county_spatial (fips_code)
-                """)
+                result = conn.execute("SELECT COUNT(*) FROM county_spatial").fetchone()
+                row_count = result[0] if result else 0
                 
-                logger.info(f"Loaded {len(spatial_records)} spatial records")
-                return len(spatial_records)
+                logger.info(f"Loaded {row_count} spatial records")
+                return row_count
                 
         except Exception as e:
             logger.error(f"Failed to load spatial data: {e}")
             raise
     
-    def _geometry_to_wkt(self, geometry: Dict[str, Any]) -> Optional[str]:
+    def _st_read_supported(self, geojson_path: str) -> bool:
+        """Check on a separate cursor whether ST_Read can open the file."""
+        try:
+            with self.db.get_cursor() as probe:
+                probe.execute(f"DESCRIBE SELECT * FROM ST_Read('{geojson_path}')")
+            return True
+        except duckdb.Error:
+            return False
+    
+    def _create_spatial_table_st_read(self, conn: duckdb.DuckDBPyConnection, geojson_path: str):
+        """Create the county_spatial table directly from the GeoJSON with ST_Read."""
+        conn.execute(f"""
+            CREATE OR REPLACE TABLE county_spatial AS
+            SELECT 
+                GEOID AS fips_code,
+                NAME AS county_name,
+                STATEFP AS state_fp,
+                CAST(geom AS GEOMETRY) AS geometry,
+                ST_SimplifyPreserveTopology(CAST(geom AS GEOMETRY), {SIMPLIFY_TOLERANCE}) AS geometry_simplified
+            FROM ST_Read('{geojson_path}')
+            WHERE GEOID IS NOT NULL AND GEOID != ''
+              AND ST_GeometryType(geom) IN ('POLYGON', 'MULTIPOLYGON')
+        """)
+    
+    def _create_spatial_table_from_features(self, conn: duckdb.DuckDBPyConnection, geojson_path: str):
+        """
+        Create the county_spatial table from GeoJSON read with GeoPandas.
+        
+        GeoPandas parses the file in C and ``to_wkb`` encodes all geometries in
+        one vectorized call; the frame is then registered and county_spatial is
+        created with a single ``ST_GeomFromWKB`` CREATE TABLE ... AS.
+        """
+        gdf = gpd.read_file(geojson_path)
+        logger.info(f"Parsed {len(gdf)} features from GeoJSON")
+        
+        spatial_df = pd.DataFrame({
+            'fips_code': gdf['GEOID'],
+            'county_name': gdf['NAME'],
+            'state_fp': gdf['STATEFP'],
+            'geometry_wkb': gdf.geometry.to_wkb()
+        })
+        
+        conn.register('spatial_stage', spatial_df)
+        try:
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE county_spatial AS
+                SELECT fips_code, county_name, state_fp, geometry,
+                       ST_SimplifyPreserveTopology(geometry, {SIMPLIFY_TOLERANCE}) AS geometry_simplified
+                FROM (
+                    SELECT fips_code, county_name, state_fp,
+                           ST_GeomFromWKB(geometry_wkb) AS geometry
+                    FROM spatial_stage
+                    WHERE fips_code IS NOT NULL AND fips_code != ''
+                      AND geometry_wkb IS NOT NULL
+                )
+                WHERE ST_GeometryType(geometry) IN ('POLYGON', 'MULTIPOLYGON')
+            """)
+        finally:
+            conn.unregister('spatial_stage')
+    
+    def create_joined_view(self, conn: Optional[duckdb.DuckDBPyConnection] = None):
         """
-        Convert GeoJSON geometry to WKT format.
+        Materialize the join of health data with spatial data as a table.
         
         Args:
-            geometry: GeoJSON geometry object
-            
-        Returns:
-            WKT string representation of geometry
+            conn: Connection to use, joining its open transaction. If None, a
+                cursor and transaction of its own are used.
         """
+        logger.info("Creating joined table of health and spatial data")
+        
         try:
-            geom_type = geometry.get('type', '')
-            coordinates = geometry.get('coordinates', [])
-            
-            if geom_type == 'Polygon':
-                return self._polygon_to_wkt(coordinates)
-            elif geom_type == 'MultiPolygon':
-                return self._multipolygon_to_wkt(coordinates)
-            else:
-                logger.warning(f"Unsupported geometry type: {geom_type}")
-                return None
+            with self._cursor(conn) as conn:
+                # Materialize the join once here instead of on every API query,
+                # keeping only the key columns and raw values the API reads
+                # rather than every numerator, CI and flag column, with raw values
+                # as DOUBLE like county_health_numeric. State and national rows
+                # have no shape and are left out.
+                with self._transaction(conn):
+                    # Earlier databases created this as a view
+                    is_view = conn.execute("""
+                        SELECT COUNT(*) FROM duckdb_views()
+                        WHERE view_name = 'counties_with_geometry'
+                    """).fetchone()[0]
+                    if is_view:
+                        conn.execute("DROP VIEW counties_with_geometry")
+                    
+                    conn.execute("""
+                        CREATE OR REPLACE TABLE counties_with_geometry AS
+                        SELECT 
+                            h.fips_code,
+                            COLUMNS(c -> c IN ('5-digit FIPS Code', 'Name', 'State Abbreviation')),
+                            TRY_CAST(COLUMNS(c -> c LIKE '% raw value') AS DOUBLE),
+                            s.county_name AS spatial_county_name,
+                            s.state_fp,
+                            s.geometry,
+                            s.geometry_simplified
+                        FROM county_health h
+                        JOIN county_spatial s ON h.fips_code = s.fips_code
+                        WHERE s.geometry IS NOT NULL
+                    """)
+                    
+                    conn.execute("""
+                        CREATE INDEX idx_cwg_fips 
+                        ON counties_with_geometry (fips_code)
+                    """)
+                    conn.execute("""
+                        CREATE INDEX idx_cwg_geom 
+                        ON counties_with_geometry USING RTREE (geometry)
+                    """)
+                
+                logger.info("Created counties_with_geometry table")
                 
         except Exception as e:
-            logger.warning(f"Failed to convert geometry to WKT: {e}")
-            return None
-    
-    def _polygon_to_wkt(self, coordinates) -> str:
-        """Convert polygon coordinates to WKT."""
-        rings = []
-        for ring in coordinates:
-            ring_coords = [f"{coord[0]} {coord[1]}" for coord in ring]
-            rings.append(f"({', '.join(ring_coords)})")
-        
-        return f"POLYGON({', '.join(rings)})"
-    
-    def _multipolygon_to_wkt(self, coordinates) -> str:
-        """Convert multipolygon coordinates to WKT."""
-        polygons = []
-        for polygon in coordinates:
-            rings = []
-            for ring in polygon:
-                ring_coords = [f"{coord[0]} {coord[1]}" for coord in ring]
-                rings.append(f"({', '.join(ring_coords)})")
-            polygons.append(f"({', '.join(rings)})")
-        
-        return f"MULTIPOLYGON({', '.join(polygons)})"
-    
-    def create_joined_view(self):
-        """Create a view that joins health data with spatial data."""
-        logger.info("Creating joined view of health and spatial data")
+            logger.error(f"Failed to create joined table: {e}")
+            raise
+    
+    def create_numeric_table(self, conn: Optional[duckdb.DuckDBPyConnection] = None):
+        """
+        Materialize the raw value columns of county_health as DOUBLE.
+        
+        The CSV columns are loaded as VARCHAR; casting them once here lets the
+        API aggregate plain numeric columns instead of parsing strings per request.
+        
+        Args:
+            conn: Connection to use, joining its open transaction. If None, a
+                cursor and transaction of its own are used.
+        """
+        logger.info("Creating numeric table of health raw values")
         
         try:
-            with self.db.get_cursor() as conn:
-                # First, let's identify and cast numeric columns properly
-                columns_result = conn.execute("DESCRIBE county_health").fetchall()
-                
-                # Build a list of columns with proper casting for numeric raw value columns
-                column_selects = []
-                for col_name, col_type in columns_result:
-                    if "raw value" in col_name:
-                        # Cast raw value columns to DOUBLE for proper numeric operations
-                        column_selects.append(f'CAST("{col_name}" AS DOUBLE) AS "{col_name}"')
-                    elif col_name in ['5-digit FIPS Code', 'Name', 'State Abbreviation']:
-                        # Keep key string columns
-                        column_selects.append(f'"{col_name}"')
-                    else:
-                        # Keep other columns as-is
-                        column_selects.append(f'"{col_name}"')
-                
-                # Create the properly typed view
-                conn.execute(f"""
-                    CREATE OR REPLACE VIEW county_health_joined AS
-                    SELECT 
-                        h."5-digit FIPS Code" as fips_code,
-                        h."Name" as county_name,
-                        h."State Abbreviation" as state_name,
-                        {", ".join([f'h.{col}' for col in column_selects])},
-                        s.geometry
-                    FROM county_health h
-                    INNER JOIN county_spatial s ON h."5-digit FIPS Code" = s.fips_code
-                    WHERE s.geometry IS NOT NULL
-                """)
+            with self._cursor(conn) as conn:
+                with self._transaction(conn):
+                    # Raw value columns keep their names; blanks and
+                    # non-numeric entries become NULL
+                    conn.execute("""
+                        CREATE OR REPLACE TABLE county_health_numeric AS
+                        SELECT 
+                            COLUMNS(c -> c IN ('fips_code', 'Name', 'State Abbreviation')),
+                            TRY_CAST(COLUMNS(c -> c LIKE '% raw value') AS DOUBLE)
+                        FROM county_health
+                        ORDER BY fips_code
+                    """)
+                    
+                    conn.execute("""
+                        CREATE INDEX idx_health_numeric_fips 
+                        ON county_health_numeric (fips_code)
+                    """)
                 
-                # Create an alternative simpler view for quick access
-                conn.execute("""
-                    CREATE OR REPLACE VIEW counties_with_geometry AS
-                    SELECT 
-                        h."5-digit FIPS Code" as fips_code,
-                        h."Name" as county_name,
-                        h."State Abbreviation" as state_name,
-                        CAST(h."Firearm Fatalities raw value" AS DOUBLE) as firearm_fatalities,
-                        CAST(h."Adverse Climate Events raw value" AS DOUBLE) as adverse_climate_events,
-                        CAST(h."Adult Obesity raw value" AS DOUBLE) as adult_obesity,
-                        CAST(h."Premature Death raw value" AS DOUBLE) as premature_death,
-                        CAST(h."Poor Physical Health Days raw value" AS DOUBLE) as poor_physical_health_days,
-                        CAST(h."Poor Mental Health Days raw value" AS DOUBLE) as poor_mental_health_days,
-                        s.geometry
-                    FROM county_health h
-                    INNER JOIN county_spatial s ON h."5-digit FIPS Code" = s.fips_code
-                    WHERE s.geometry IS NOT NULL
-                """)
+                logger.info("Created county_health_numeric table")
                 
-                logger.info("Created counties_with_geometry view")
+        except Exception as e:
+            logger.error(f"Failed to create numeric table: {e}")
+            raise
+    
+    def create_neighbors_table(self, conn: Optional[duckdb.DuckDBPyConnection] = None):
+        """
+        Materialize county adjacency as (fips_code, neighbor_fips) pairs.
+        
+        Boundaries don't change between ETL runs, so the ``ST_Touches`` self-join
+        runs once here and neighbor lookups become an indexed scan.
+        
+        Args:
+            conn: Connection to use, joining its open transaction. If None, a
+                cursor and transaction of its own are used.
+        """
+        logger.info("Creating county neighbors table")
+        
+        try:
+            with self._cursor(conn) as conn:
+                with self._transaction(conn):
+                    conn.execute("""
+                        CREATE OR REPLACE TABLE county_neighbors AS
+                        SELECT
+                            a."5-digit FIPS Code" AS fips_code,
+                            b."5-digit FIPS Code" AS neighbor_fips
+                        FROM counties_with_geometry a
+                        JOIN counties_with_geometry b ON ST_Touches(a.geometry, b.geometry)
+                        WHERE a."5-digit FIPS Code" != b."5-digit FIPS Code"
+                        ORDER BY fips_code
+                    """)
+                    
+                    conn.execute("""
+                        CREATE INDEX idx_county_neighbors_fips
+                        ON county_neighbors (fips_code)
+                    """)
                 
+                result = conn.execute("SELECT COUNT(*) FROM county_neighbors").fetchone()
+                logger.info(f"Created county_neighbors table with {result[0]} pairs")
+        
         except Exception as e:
-            logger.error(f"Failed to create joined view: {e}")
+            logger.error(f"Failed to create neighbors table: {e}")
             raise
     
     def validate_data(self) -> Dict[str, Any]:
@@ -266,34 +527,19 @@ class CountyHealthETL:
         
         try:
             with self.db.get_cursor() as conn:
-                # Count health records
-                result = conn.execute("SELECT COUNT(*) FROM county_health").fetchone()
-                health_count = result[0] if result else 0
-                
-                # Count spatial records
-                result = conn.execute("SELECT COUNT(*) FROM county_spatial").fetchone()
-                spatial_count = result[0] if result else 0
-                
-                # Count joined records
-                result = conn.execute("""
-                    SELECT COUNT(*) FROM counties_with_geometry 
-                    WHERE geometry IS NOT NULL
-                """).fetchone()
-                joined_count = result[0] if result else 0
-                
-                # Check for missing geometries
-                result = conn.execute("""
-                    SELECT COUNT(*) FROM counties_with_geometry 
-                    WHERE geometry IS NULL
-                """).fetchone()
-                missing_geometries = result[0] if result else 0
-                
-                # Check for duplicate FIPS codes
-                result = conn.execute("""
-                    SELECT COUNT(*) - COUNT(DISTINCT "5-digit FIPS Code") as duplicates
-                    FROM county_health
+                # One pass over each table for all counts
+                health_count, duplicate_fips, spatial_count, joined_count, missing_geometries = conn.execute("""
+                    SELECT h.n, h.duplicates, s.n, j.joined, j.missing
+                    FROM (
+                        SELECT COUNT(*) AS n, COUNT(*) - COUNT(DISTINCT fips_code) AS duplicates
+                        FROM county_health
+                    ) h,
+                    (SELECT COUNT(*) AS n FROM county_spatial) s,
+                    (
+                        SELECT COUNT(geometry) AS joined, COUNT(*) - COUNT(geometry) AS missing
+                        FROM counties_with_geometry
+                    ) j
                 """).fetchone()
-                duplicate_fips = result[0] if result else 0
                 
                 validation_results = {
                     'health_records': health_count,
@@ -334,32 +580,55 @@ class CountyHealthETL:
         """
         logger.info("Starting full ETL pipeline")
         
+        data_dir = Path(health_csv_path).parent
+        sources = {
+            'county_health': health_csv_path,
+            'county_spatial': spatial_geojson_path,
+            'variable_metadata': data_dir / DATA_DICTIONARY_FILE,
+        }
+        
+        cached = self._cached_etl_results(sources)
+        if cached:
+            logger.info("ETL cache hit, inputs unchanged since last run")
+            return cached
+        
+        results = {}
+        
         try:
-            results = {}
-            
-            # Step 1: Load health data
-            logger.info("Step 1: Loading health data")
-            health_rows = self.load_county_health_data(health_csv_path)
-            results['health_rows_loaded'] = health_rows
-            
-            # Step 2: Load spatial data
-            logger.info("Step 2: Loading spatial data")
-            spatial_rows = self.load_spatial_data(spatial_geojson_path)
-            results['spatial_rows_loaded'] = spatial_rows
-            
-            # Step 3: Create joined view
-            logger.info("Step 3: Creating joined view")
-            self.create_joined_view()
-            
-            # Step 4: Load variable metadata
-            logger.info("Step 4: Loading variable metadata")
-            data_dir = Path(health_csv_path).parent
-            metadata = load_variable_metadata(data_dir)
-            
-            with self.db.get_cursor() as conn:
-                create_metadata_table(conn, metadata)
-            
-            results['metadata_vars_loaded'] = len(metadata)
+            # The data dictionary is parsed on its own connection, so read it in
+            # the background while the main tables load. The loads themselves
+            # stay sequential: they share one transaction, and concurrent
+            # writers would conflict on etl_metadata.
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                metadata_future = executor.submit(load_variable_metadata, data_dir)
+                
+                # Run every load step in one transaction so a failure part-way
+                # leaves the database as it was
+                with self.db.get_cursor() as conn, self._transaction(conn):
+                    # Step 1: Load health data
+                    logger.info("Step 1: Loading health data")
+                    health_rows = self.load_county_health_data(health_csv_path, conn)
+                    results['health_rows_loaded'] = health_rows
+                    
+                    # Step 2: Load spatial data
+                    logger.info("Step 2: Loading spatial data")
+                    spatial_rows = self.load_spatial_data(spatial_geojson_path, conn)
+                    results['spatial_rows_loaded'] = spatial_rows
+                    
+                    # Step 3: Create joined, numeric and neighbors tables
+                    logger.info("Step 3: Creating joined, numeric and neighbors tables")
+                    self.create_joined_view(conn)
+                    self.create_numeric_table(conn)
+                    self.create_neighbors_table(conn)
+                    
+                    # Step 4: Load variable metadata
+                    logger.info("Step 4: Loading variable metadata")
+                    metadata = metadata_future.result()
+                    create_metadata_table(conn, metadata)
+                    if sources['variable_metadata'].exists():
+                        self._record_source(conn, 'variable_metadata', sources['variable_metadata'])
+                    
+                    results['metadata_vars_loaded'] = len(metadata)
             
             # Step 5: Validate results
             logger.info("Step 5: Validating ETL results")
@@ -371,6 +640,7 @@ class CountyHealthETL:
                 logger.warning(f"Low join success rate: {validation['join_success_rate']:.1f}%")
             
             results['success'] = True
+            self._store_etl_results(results)
             logger.info("ETL pipeline completed successfully")
             
             return results
@@ -384,6 +654,53 @@ class CountyHealthETL:
                 'spatial_rows_loaded': results.get('spatial_rows_loaded', 0),
                 'metadata_vars_loaded': results.get('metadata_vars_loaded', 0)
             }
+    
+    def _cached_etl_results(self, sources: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Return the stored results of the last ETL run if none of its inputs changed.
+        
+        Args:
+            sources: Mapping of table name to the source file it is loaded from
+            
+        Returns:
+            Results dictionary from the last successful run, or None
+        """
+        with self.db.get_cursor() as conn:
+            self._ensure_etl_results_table(conn)
+            
+            result = conn.execute("SELECT results FROM etl_results WHERE id = 1").fetchone()
+            if not result:
+                return None
+            
+            for table_name, source_path in sources.items():
+                if not Path(source_path).exists():
+                    if table_name == 'variable_metadata':
+                        continue
+                    return None
+                if not self._source_unchanged(conn, table_name, source_path):
+                    return None
+            
+            return json.loads(result[0])
+    
+    def _store_etl_results(self, results: Dict[str, Any]):
+        """Store the results of a successful ETL run for later cache hits."""
+        with self.db.get_cursor() as conn:
+            self._ensure_etl_results_table(conn)
+            conn.execute("""
+                INSERT OR REPLACE INTO etl_results (id, results, completed_at)
+                VALUES (1, ?, current_timestamp)
+            """, [json.dumps(results)])
+    
+    @staticmethod
+    def _ensure_etl_results_table(conn: duckdb.DuckDBPyConnection):
+        """Create the table holding the results of the last ETL run."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS etl_results (
+                id INTEGER PRIMARY KEY,
+                results VARCHAR,
+                completed_at TIMESTAMP
+            )
+        """)
 
 
 def run_etl():
@@ -427,44 +744,39 @@ def load_variable_metadata(data_dir: Path) -> Dict[str, Dict[str, str]]:
     """
     logger.info("Loading variable metadata from data dictionary")
     
-    dict_path = data_dir / "DataDictionary_2025.csv"
+    dict_path = data_dir / DATA_DICTIONARY_FILE
     if not dict_path.exists():
         logger.warning(f"Data dictionary not found at {dict_path}")
         return {}
     
     try:
-        df = pd.read_csv(dict_path)
-        logger.info(f"Loaded data dictionary with {len(df)} entries")
+        # Only raw value variables are needed; filter them in the scan
+        with duckdb.connect() as conn:
+            rows = conn.execute(f"""
+                SELECT "Variable Name", "Description", "Measure"
+                FROM read_csv('{dict_path}', header=true, all_varchar=true)
+                WHERE "Variable Name" LIKE '%rawvalue%'
+            """).fetchall()
+        logger.info(f"Loaded {len(rows)} raw value entries from data dictionary")
         
         metadata = {}
         
-        for _, row in df.iterrows():
-            var_name = row['Variable Name']
-            description = row['Description']
-            measure = row.get('Measure', '')
+        for var_name, description, measure in rows:
+            # Extract base variable code (e.g., v001 from v001_rawvalue)
+            var_code = var_name.split('_')[0]
+            description = description or ''
             
-            # Only process raw value variables
-            if 'rawvalue' in var_name:
-                # Extract base variable code (e.g., v001 from v001_rawvalue)
-                var_code = var_name.split('_')[0]
-                
-                # Determine units and data type from description
-                units = extract_units_from_description(description)
-                data_type = determine_data_type(description)
-                
-                # Clean up the description
-                clean_description = description.strip()
-                if clean_description.endswith('.'):
-                    clean_description = clean_description[:-1]
-                
-                metadata[var_code] = {
-                    'description': clean_description,
-                    'measure': measure.strip() if measure else '',
-                    'units': units,
-                    'data_type': data_type,
-                    'raw_variable': var_name,
-                    'measure_name': measure.strip() if measure else ''
-                }
+            # Clean up the description
+            clean_description = description.strip()
+            if clean_description.endswith('.'):
+                clean_description = clean_description[:-1]
+            
+            metadata[var_code] = {
+                'description': clean_description,
+                'measure': measure.strip() if measure else '',
+                'raw_variable': var_name,
+                'measure_name': measure.strip() if measure else ''
+            }
         
         logger.info(f"Processed metadata for {len(metadata)} health variables")
         return metadata
@@ -474,55 +786,6 @@ def load_variable_metadata(data_dir: Path) -> Dict[str, Dict[str, str]]:
         return {}
 
 
-def extract_units_from_description(description: str) -> str:
-    """Extract units from a variable description."""
-    description = description.lower()
-    
-    # Common unit patterns
-    if 'per 100,000' in description:
-        return 'per 100,000 population'
-    elif 'per 1,000' in description:
-        return 'per 1,000 population'
-    elif 'per 10,000' in description:
-        return 'per 10,000 population'
-    elif 'percentage' in description or 'percent' in description:
-        return 'percentage'
-    elif 'years' in description and 'life' in description:
-        return 'years'
-    elif 'days' in description:
-        return 'days'
-    elif 'ratio' in description:
-        return 'ratio'
-    elif 'index' in description:
-        return 'index'
-    elif 'number of' in description and 'per' not in description:
-        return 'count'
-    elif 'rate' in description:
-        return 'rate'
-    else:
-        return 'numeric'
-
-
-def determine_data_type(description: str) -> str:
-    """Determine the appropriate data type category."""
-    description = description.lower()
-    
-    if any(term in description for term in ['death', 'mortality', 'fatalities', 'life expectancy']):
-        return 'mortality'
-    elif any(term in description for term in ['percentage', 'percent']):
-        return 'percentage'
-    elif any(term in description for term in ['rate', 'per 100,000', 'per 1,000']):
-        return 'rate'
-    elif any(term in description for term in ['income', 'dollar']):
-        return 'currency'
-    elif 'index' in description:
-        return 'index'
-    elif 'ratio' in description:
-        return 'ratio'
-    else:
-        return 'numeric'
-
-
 def create_metadata_table(conn: duckdb.DuckDBPyConnection, metadata: Dict[str, Dict[str, str]]):
     """Create and populate the variable metadata table."""
     logger.info("Creating variable metadata table")
@@ -544,44 +807,67 @@ def create_metadata_table(conn: duckdb.DuckDBPyConnection, metadata: Dict[str, D
         )
     """)
     
-    # Insert metadata
-    for var_code, meta in metadata.items():
-        # Create display name from description
-        display_name = create_display_name(meta['description'])
-        
-        conn.execute("""
+    # Insert metadata in one statement
+    meta_df = pd.DataFrame(
+        [{'variable_code': var_code, **meta} for var_code, meta in metadata.items()],
+        columns=['variable_code', 'description', 'measure', 'raw_variable', 'measure_name']
+    )
+    
+    conn.register('meta_df', meta_df)
+    try:
+        conn.execute(f"""
             INSERT INTO variable_metadata 
-            (variable_code, display_name, description, measure, units, data_type, raw_variable, measure_name)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        """, [
-            var_code,
-            display_name,
-            meta['description'],
-            meta['measure'],
-            meta['units'],
-            meta['data_type'],
-            meta['raw_variable'],
-            meta['measure_name']
-        ])
+            SELECT variable_code, {DISPLAY_NAME_SQL}, description, measure,
+                   {UNITS_SQL}, {DATA_TYPE_SQL}, raw_variable, measure_name
+            FROM meta_df
+        """)
+    finally:
+        conn.unregister('meta_df')
     
     logger.info(f"Inserted metadata for {len(metadata)} variables")
 
 
-def create_display_name(description: str) -> str:
-    """Create a clean display name from the description."""
-    # Take the first part of the description, usually the main concept
-    parts = description.split('.')
-    if len(parts) > 1:
-        # Use the first sentence if it's descriptive enough
-        first_part = parts[0].strip()
-        if len(first_part) > 10:
-            return first_part
-    
-    # Otherwise use the full description, truncated if too long
-    if len(description) > 60:
-        return description[:57] + "..."
-    
-    return description
+# Units classified from keywords in a description, first match wins
+UNITS_SQL = """
+    CASE
+        WHEN contains(lower(description), 'per 100,000') THEN 'per 100,000 population'
+        WHEN contains(lower(description), 'per 1,000') THEN 'per 1,000 population'
+        WHEN contains(lower(description), 'per 10,000') THEN 'per 10,000 population'
+        WHEN contains(lower(description), 'percent') THEN 'percentage'
+        WHEN contains(lower(description), 'years') AND contains(lower(description), 'life') THEN 'years'
+        WHEN contains(lower(description), 'days') THEN 'days'
+        WHEN contains(lower(description), 'ratio') THEN 'ratio'
+        WHEN contains(lower(description), 'index') THEN 'index'
+        WHEN contains(lower(description), 'number of') AND NOT contains(lower(description), 'per') THEN 'count'
+        WHEN contains(lower(description), 'rate') THEN 'rate'
+        ELSE 'numeric'
+    END AS units
+"""
+
+# Data type category classified from keywords in a description, first match wins
+DATA_TYPE_SQL = """
+    CASE
+        WHEN regexp_matches(lower(description), 'death|mortality|fatalities|life expectancy') THEN 'mortality'
+        WHEN contains(lower(description), 'percent') THEN 'percentage'
+        WHEN regexp_matches(lower(description), 'rate|per 100,000|per 1,000') THEN 'rate'
+        WHEN regexp_matches(lower(description), 'income|dollar') THEN 'currency'
+        WHEN contains(lower(description), 'index') THEN 'index'
+        WHEN contains(lower(description), 'ratio') THEN 'ratio'
+        ELSE 'numeric'
+    END AS data_type
+"""
+
+# Display name built from a description: its first sentence if that is
+# descriptive enough, otherwise the description truncated to 60 characters
+DISPLAY_NAME_SQL = """
+    CASE
+        WHEN contains(description, '.') AND length(trim(split_part(description, '.', 1))) > 10
+            THEN trim(split_part(description, '.', 1))
+        WHEN length(description) > 60
+            THEN substr(description, 1, 57) || '...'
+        ELSE description
+    END AS display_name
+"""
 
 
 if __name__ == "__main__":
@@ -3,15 +3,18 @@ Main FastAPI application for County Health Explorer.
 """
 
 import logging
+import time
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, Request
+from pathlib import Path
+from typing import Dict, Tuple
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
 import uvicorn
 
 from .database import init_database, get_db
-from .routes.api import router as api_router
+from .routes.api import router as api_router, refresh_variable_cache, get_county_geometries, OrjsonResponse
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +23,58 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Static frontend, served by this app so the browser talks to one process
+FRONTEND_DIR = Path(__file__).resolve().parents[2] / "frontend"
+
+# Seconds the /health record counts are reused before the tables are recounted
+HEALTH_COUNTS_TTL = 60
+
+_record_counts: Dict[str, Tuple[float, int, int]] = {}
+
+
+def get_record_counts() -> Tuple[int, int]:
+    """Get (health_records, spatial_records), recounting at most every HEALTH_COUNTS_TTL seconds."""
+    cached = _record_counts.get("counts")
+    if cached and time.monotonic() - cached[0] < HEALTH_COUNTS_TTL:
+        return cached[1], cached[2]
+    
+    db = get_db()
+    with db.get_cursor() as conn:
+        health_records, spatial_records = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM county_health),
+                (SELECT COUNT(*) FROM county_spatial)
+        """).fetchone()
+    
+    _record_counts["counts"] = (time.monotonic(), health_records, spatial_records)
+    return health_records, spatial_records
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip middleware that skips routes which already encode their own bodies."""
+    
+    # /choropleth sets Content-Encoding itself from its pre-compressed cache.
+    # Older Starlette releases gzip such responses a second time, so they
+    # bypass the middleware instead of relying on it to pass them through.
+    precompressed_paths = frozenset({"/api/choropleth"})
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.precompressed_paths:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+class FrontendFiles(StaticFiles):
+    """Static frontend files, without the .gz copies the dev server writes next to them."""
+    
+    async def get_response(self, path: str, scope):
+        # The dev server sends these with Content-Encoding: gzip; served here
+        # they would only be opaque downloads
+        if path.endswith(".gz"):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -28,6 +83,9 @@ async def lifespan(app: FastAPI):
     logger.info("Starting County Health Explorer API")
     try:
         init_database()
+        get_record_counts()
+        refresh_variable_cache()
+        get_county_geometries()
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Failed to initialize database: {e}")
@@ -46,6 +104,7 @@ app = FastAPI(
     title="County Health Explorer API",
     description="Spatial data science API for exploring U.S. county-level health data",
     version="1.0.0",
+    default_response_class=OrjsonResponse,
     lifespan=lifespan
 )
 
@@ -58,6 +117,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses
+app.add_middleware(JSONGZipMiddleware, minimum_size=1024)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -66,7 +128,7 @@ app.include_router(api_router, prefix="/api")
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler for consistent error responses."""
     logger.error(f"Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    return OrjsonResponse(
         status_code=500,
         content={
             "error": "Internal Server Error",
@@ -77,18 +139,12 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Health check endpoint
 @app.get("/health")
-async def health_check():
+def health_check():
     """Health check endpoint."""
     try:
-        db = get_db()
-        with db.get_cursor() as conn:
-            # Test database connection
-            result = conn.execute("SELECT COUNT(*) FROM county_health").fetchone()
-            health_records = result[0] if result else 0
-            
-            result = conn.execute("SELECT COUNT(*) FROM county_spatial").fetchone()
-            spatial_records = result[0] if result else 0
-            
+        # Counts only change when the ETL reruns, so probes reuse recent ones
+        health_records, spatial_records = get_record_counts()
+        
         return {
             "status": "healthy",
             "database": "connected",
@@ -97,7 +153,7 @@ async def health_check():
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
-        return JSONResponse(
+        return OrjsonResponse(
             status_code=503,
             content={
                 "status": "unhealthy",
@@ -114,9 +170,14 @@ async def root():
         "version": "1.0.0",
         "docs": "/docs",
         "health": "/health",
-        "api": "/api"
+        "api": "/api",
+        "frontend": "/app/"
     }
 
+# Serve the frontend under /app/, leaving / to the API descriptor above
+if FRONTEND_DIR.is_dir():
+    app.mount("/app", FrontendFiles(directory=FRONTEND_DIR, html=True), name="frontend")
+
 
 if __name__ == "__main__":
     uvicorn.run(
@@ -3,28 +3,401 @@ API routes for County Health Explorer.
 Implements all endpoints specified in the PRD.
 """
 
-import json
+import gzip
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import JSONResponse
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
 import numpy as np
-from scipy.stats import pearsonr
+import orjson
+from scipy import sparse, stats
+from scipy.spatial import cKDTree
 
 from ..database import get_db
+from ..encoding import accepts_gzip
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+class OrjsonResponse(JSONResponse):
+    """JSON response encoded with orjson, which also handles numpy values and geometry fragments."""
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+
+
+# Health variables are read from the schema once; it does not change while the app runs
+_VAR_CACHE: Optional[List[Dict[str, str]]] = None
+_VAR_MAP: Dict[str, str] = {}
+_VAR_INFO: Dict[str, Dict[str, str]] = {}
+_HAS_NUMERIC_TABLE = False
+_HAS_NEIGHBORS_TABLE = False
+_GEOMETRY_COLUMN = "geometry"  # Geometry served to clients; the simplified copy when the ETL made one
+_COLUMNS_CACHE: List[Tuple[str, str]] = []  # (name, type) of every county_health column
+_CATEGORIES_BODY = b""  # Encoded /variables/categories response
+_VAR_CACHE_LOCK = threading.Lock()
+
+# Per-column summary statistics and choropleth class breaks, derived from the same static data
+_STATS_CACHE: Dict[str, Tuple] = {}
+_BREAKS_CACHE: Dict[str, List[float]] = {}
+
+# Pairwise Pearson correlations between raw value columns over mapped counties:
+# column -> matrix index, coefficients, and the number of counties in each pair
+_CORR_INDEX: Dict[str, int] = {}
+_CORR_MATRIX = np.empty((0, 0))
+_CORR_COUNTS = np.empty((0, 0), dtype=np.int64)
+
+# Encoded /choropleth responses for the most recently requested variables, as
+# (body, gzipped body, ETag); ~5 MB each uncompressed
+CHOROPLETH_CACHE_SIZE = 8
+_CHOROPLETH_CACHE: "OrderedDict[str, Tuple[bytes, bytes, str]]" = OrderedDict()
+_CHOROPLETH_CACHE_LOCK = threading.Lock()
+
+# gzip level for cached /choropleth bodies: close to level 6's size in well
+# under half the time
+CHOROPLETH_GZIP_LEVEL = 4
+
+# Serialized county GeoJSON geometries keyed by FIPS code
+_GEOM_CACHE: Optional[Dict[str, orjson.Fragment]] = None
+_GEOM_CACHE_LOCK = threading.Lock()
+
+# County centroids as (FIPS codes in sorted order, matching (lon, lat) rows)
+_CENTROID_CACHE: Optional[Tuple[np.ndarray, np.ndarray]] = None
+_CENTROID_CACHE_LOCK = threading.Lock()
+
+
+# Fallback units and descriptions for variables without metadata: an exact name
+# match first, then the first rule whose predicate matches the variable name
+UnitRule = Tuple[Callable[[str], bool], str, str]
+
+_RATE_UNITS = "per 100,000 population"
+_PERCENTAGE_TRANSFORMED = ("percentage", "Percentage value (transformed from decimal)")
+
+_EXACT_UNITS: Dict[str, Tuple[str, str]] = {
+    'premature_death': ("years lost per 100,000", "Years of potential life lost before age 75 per 100,000 population (age-adjusted)"),
+    'hiv_prevalence': (_RATE_UNITS, "Number of people aged 13 years and older living with a diagnosis of HIV per 100,000 population"),
+}
+_STATS_EXACT_UNITS: Dict[str, Tuple[str, str]] = {
+    **_EXACT_UNITS,
+    'traffic_volume': ("vehicles per meter per day", "Average daily traffic volume per meter of road length"),
+}
+_TRANSFORMED_EXACT_UNITS: Dict[str, Tuple[str, str]] = {
+    **_STATS_EXACT_UNITS,
+    'unemployment': ("percentage", "Percentage of population ages 16 and older unemployed but seeking work"),
+    'mammography_screening': ("percentage", "Percentage of female Medicare enrollees ages 65-74 who received an annual mammography screening"),
+    'adult_obesity': ("percentage", "Percentage of adults aged 20 and older with obesity (BMI ≥ 30)"),
+    'adult_smoking': _PERCENTAGE_TRANSFORMED,
+    'physical_inactivity': _PERCENTAGE_TRANSFORMED,
+    'flu_vaccinations': _PERCENTAGE_TRANSFORMED,
+    'children_in_poverty': _PERCENTAGE_TRANSFORMED,
+}
+
+
+def _is_rate(var: str) -> bool:
+    """Deaths (other than premature death) and mortality are population-standardized rates."""
+    return var in ['firearm_fatalities', 'drug_overdose_deaths'] or ('death' in var and 'premature' not in var) or 'mortality' in var
+
+
+def _is_adult_percentage(var: str) -> bool:
+    """Adult behaviour measures are percentages of the adult population."""
+    return 'obesity' in var or 'smoking' in var or 'physical_inactivity' in var
+
+
+_HEALTH_DAYS_RULE: UnitRule = (lambda var: 'health_days' in var, "days per month", "Average number of unhealthy days reported in past 30 days (age-adjusted)")
+_CLIMATE_RULE: UnitRule = (lambda var: 'climate' in var, "0-3 categories", "Climate threshold categories met (heat, drought, disasters)")
+
+_TRANSFORMED_UNIT_RULES: List[UnitRule] = [
+    _HEALTH_DAYS_RULE,
+    (_is_rate, _RATE_UNITS, "Population-standardized rate for fair comparison"),
+    _CLIMATE_RULE,
+]
+_STATS_UNIT_RULES: List[UnitRule] = [
+    *_TRANSFORMED_UNIT_RULES,
+    (_is_adult_percentage, "percentage", "Percentage of adult population"),
+    (lambda var: 'income' in var, "dollars", "Economic indicator"),
+    (lambda var: 'poverty' in var, "percentage", "Economic indicator"),
+    (lambda var: 'education' in var, "percentage", "Educational attainment indicator"),
+]
+_CHOROPLETH_UNIT_RULES: List[UnitRule] = [
+    (_is_rate, _RATE_UNITS, "Population-standardized rate"),
+    (lambda var: 'climate' in var, "0-3 categories", "Climate threshold categories met"),
+    (lambda var: 'obesity' in var or 'smoking' in var, "percentage", "Percentage of adult population"),
+]
+
+
+def _smart_units(var: str, exact_units: Dict[str, Tuple[str, str]], rules: List[UnitRule]) -> Tuple[str, str]:
+    """Get (units, description) for a variable from an exact-name table and a rule list."""
+    if var in exact_units:
+        return exact_units[var]
+    
+    return next(((units, description) for matches, units, description in rules if matches(var)), ("", ""))
+
+
 def get_health_variables() -> List[Dict[str, str]]:
-    """Get list of available health variables from the database with metadata."""
+    """Get list of available health variables with metadata, loading them on first use."""
+    if _VAR_CACHE is None:
+        with _VAR_CACHE_LOCK:
+            if _VAR_CACHE is None:
+                _refresh_variable_cache()
+    
+    return _VAR_CACHE
+
+
+def refresh_variable_cache() -> List[Dict[str, str]]:
+    """Reload the cached health variables from the database."""
+    with _VAR_CACHE_LOCK:
+        return _refresh_variable_cache()
+
+
+def _refresh_variable_cache() -> List[Dict[str, str]]:
+    """Reload the variable cache; the caller must hold _VAR_CACHE_LOCK."""
+    global _VAR_CACHE, _VAR_MAP, _VAR_INFO, _HAS_NUMERIC_TABLE, _HAS_NEIGHBORS_TABLE, _GEOMETRY_COLUMN, _CATEGORIES_BODY, _COLUMNS_CACHE, _STATS_CACHE
+    global _CORR_INDEX, _CORR_MATRIX, _CORR_COUNTS, _GEOM_CACHE, _CENTROID_CACHE
+    db = get_db()
+    with db.get_cursor() as conn:
+        # Get all columns from county_health table as (name, type)
+        _COLUMNS_CACHE = [(row[0], row[1]) for row in conn.execute("DESCRIBE county_health").fetchall()]
+        
+        # Tables materialized by the ETL; older databases fall back to live queries
+        tables = {row[0] for row in conn.execute("""
+            SELECT table_name FROM duckdb_tables()
+            WHERE table_name IN ('county_health_numeric', 'county_neighbors')
+        """).fetchall()}
+        _HAS_NUMERIC_TABLE = 'county_health_numeric' in tables
+        _HAS_NEIGHBORS_TABLE = 'county_neighbors' in tables
+        
+        # Both geometry tables carry the simplified copy once the ETL has rerun
+        has_simplified = conn.execute("""
+            SELECT COUNT(*) = 2 FROM duckdb_columns()
+            WHERE column_name = 'geometry_simplified'
+              AND table_name IN ('county_spatial', 'counties_with_geometry')
+        """).fetchone()[0]
+        _GEOMETRY_COLUMN = "geometry_simplified" if has_simplified else "geometry"
+    
+    variables = _load_health_variables(_COLUMNS_CACHE)
+    
+    _VAR_MAP = {v["name"]: v["column"] for v in variables}
+    _VAR_INFO = {v["name"]: v for v in variables}
+    _CATEGORIES_BODY = orjson.dumps(_group_variables_by_category(variables))
+    _STATS_CACHE = _load_variable_stats([v["column"] for v in variables])
+    _CORR_INDEX, _CORR_MATRIX, _CORR_COUNTS = _load_correlations([v["column"] for v in variables])
+    
+    with _CHOROPLETH_CACHE_LOCK:
+        _CHOROPLETH_CACHE.clear()
+    _BREAKS_CACHE.clear()
+    
+    # Geometries, centroids and spatial weights are rebuilt from the new tables on next use
+    with _GEOM_CACHE_LOCK:
+        _GEOM_CACHE = None
+    with _CENTROID_CACHE_LOCK:
+        _CENTROID_CACHE = None
+    _knn_weights.cache_clear()
+    
+    # Publish last: other threads only skip the lock once everything above is set
+    _VAR_CACHE = variables
+    return variables
+
+
+def _group_variables_by_category(variables: List[Dict[str, str]]) -> Dict[str, List[Dict[str, str]]]:
+    """Group variables by health domain based on common themes in their display names."""
+    categories = {
+        "mortality": [],
+        "behavioral": [],
+        "clinical": [],
+        "social": [],
+        "physical_environment": [],
+        "demographics": []
+    }
+    
+    for var in variables:
+        name = var["display_name"].lower()
+        
+        if any(term in name for term in ["death", "mortality", "life expectancy", "fatalities", "suicide"]):
+            categories["mortality"].append(var)
+        elif any(term in name for term in ["smoking", "drinking", "obesity", "physical inactivity"]):
+            categories["behavioral"].append(var)
+        elif any(term in name for term in ["health days", "diabetes", "hiv", "mental", "distress"]):
+            categories["clinical"].append(var)
+        elif any(term in name for term in ["income", "poverty", "education", "unemployment", "housing", "associations"]):
+            categories["social"].append(var)
+        elif any(term in name for term in ["air pollution", "water", "housing", "climate", "environment"]):
+            categories["physical_environment"].append(var)
+        else:
+            categories["demographics"].append(var)
+    
+    return categories
+
+
+def _load_variable_stats(column_names: List[str]) -> Dict[str, Tuple]:
+    """Compute (count, mean, std, min, max, median) for every raw value column in one query."""
+    if not column_names:
+        return {}
+    
+    db = get_db()
+    with db.get_cursor() as conn:
+        # Unpivot to one (column, value) row per non-NULL value and aggregate per column
+        result = conn.execute(f"""
+            SELECT 
+                column_name,
+                COUNT(value) as count,
+                AVG(value) as mean,
+                STDDEV(value) as std,
+                MIN(value) as min,
+                MAX(value) as max,
+                MEDIAN(value) as median
+            FROM (
+                UNPIVOT (SELECT COLUMNS(c -> c LIKE '% raw value') FROM {_numeric_relation(tuple(column_names))})
+                ON COLUMNS(*)
+                INTO NAME column_name VALUE value
+            )
+            GROUP BY column_name
+        """).fetchall()
+    
+    return {row[0]: tuple(row[1:]) for row in result}
+
+
+def _load_correlations(column_names: List[str]) -> Tuple[Dict[str, int], np.ndarray, np.ndarray]:
+    """
+    Compute Pearson correlations between every pair of raw value columns.
+    
+    Each pair uses the counties with a geometry where both values are present,
+    as /corr always has. Returns the column index, the coefficients and the
+    per-pair county counts.
+    """
+    column_names = list(dict.fromkeys(column_names))
+    if not column_names:
+        return {}, np.empty((0, 0)), np.empty((0, 0), dtype=np.int64)
+    
+    db = get_db()
+    select = ", ".join(f'h."{col}"' for col in column_names)
+    columns = db.query_columns(f"""
+        SELECT {select}
+        FROM {_numeric_relation(tuple(column_names))} h
+        INNER JOIN county_spatial s ON h.fips_code = s.fips_code
+        WHERE s.geometry IS NOT NULL
+    """)
+    
+    # Columns with NULLs come back as masked arrays
+    values = np.column_stack([np.ma.filled(columns[col].astype(np.float64), np.nan) for col in column_names])
+    present = ~np.isnan(values)
+    mask = present.astype(np.float64)
+    
+    # Center each column first so the sums below don't cancel catastrophically,
+    # then get every pair's sums over its shared counties as matrix products
+    counts = present.sum(axis=0)
+    means = np.where(present, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    centered = np.where(present, values - means, 0.0)
+    
+    n = mask.T @ mask
+    sum_x = centered.T @ mask
+    sum_xx = (centered * centered).T @ mask
+    sum_xy = centered.T @ centered
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_x.T / n
+        var_x = sum_xx - sum_x * sum_x / n
+        correlation = np.clip(cov / np.sqrt(var_x * var_x.T), -1.0, 1.0)
+    
+    return {col: i for i, col in enumerate(column_names)}, correlation, n.astype(np.int64)
+
+
+def get_county_geometries() -> Dict[str, orjson.Fragment]:
+    """Get county GeoJSON geometries keyed by FIPS code, loading them on first use."""
+    global _GEOM_CACHE
+    if _GEOM_CACHE is None:
+        # Settles which geometry column to serialize
+        get_health_variables()
+        with _GEOM_CACHE_LOCK:
+            if _GEOM_CACHE is None:
+                _GEOM_CACHE = _load_county_geometries()
+    
+    return _GEOM_CACHE
+
+
+def _load_county_geometries() -> Dict[str, orjson.Fragment]:
+    """Serialize every county's simplified geometry to GeoJSON once."""
+    db = get_db()
+    with db.get_cursor() as conn:
+        result = conn.execute(f"""
+            SELECT fips_code, ST_AsGeoJSON({_GEOMETRY_COLUMN}) as geometry_json
+            FROM county_spatial
+            WHERE geometry IS NOT NULL
+        """).fetchall()
+    
+    # Keep the GeoJSON text as is; orjson embeds fragments in the response
+    # without parsing them into dicts and encoding them again
+    geometries = {
+        fips_code: orjson.Fragment(geometry_json)
+        for fips_code, geometry_json in result
+        if geometry_json
+    }
+    
+    logger.info(f"Cached {len(geometries)} county geometries")
+    return geometries
+
+
+def get_county_centroids() -> Tuple[np.ndarray, np.ndarray]:
+    """Get county centroids as sorted FIPS codes and (lon, lat) rows, computing them on first use."""
+    global _CENTROID_CACHE
+    if _CENTROID_CACHE is None:
+        with _CENTROID_CACHE_LOCK:
+            if _CENTROID_CACHE is None:
+                _CENTROID_CACHE = _load_county_centroids()
+    
+    return _CENTROID_CACHE
+
+
+def _load_county_centroids() -> Tuple[np.ndarray, np.ndarray]:
+    """Compute every county centroid once."""
+    db = get_db()
+    columns = db.query_columns("""
+        SELECT 
+            fips_code,
+            ST_X(ST_Centroid(geometry)) as lon,
+            ST_Y(ST_Centroid(geometry)) as lat
+        FROM county_spatial
+        WHERE geometry IS NOT NULL
+        ORDER BY fips_code
+    """)
+    
+    logger.info(f"Cached {len(columns['fips_code'])} county centroids")
+    return columns["fips_code"], np.column_stack([columns["lon"], columns["lat"]])
+
+
+def _numeric_source(*column_names: str) -> str:
+    """
+    FROM clause with fips_code, "Name", "State Abbreviation" and the given raw
+    value columns as DOUBLE.
+    
+    Reads county_health_numeric when the ETL has built it. Databases from
+    older ETL runs fall back to casting the county_health columns per query.
+    """
+    get_health_variables()  # Make sure the table check has run
+    return _numeric_relation(column_names)
+
+
+def _numeric_relation(column_names: Tuple[str, ...]) -> str:
+    """_numeric_source() without loading the variable cache, for use while it loads."""
+    if _HAS_NUMERIC_TABLE:
+        return "county_health_numeric"
+    
+    casts = ", ".join(f'TRY_CAST("{col}" AS DOUBLE) AS "{col}"' for col in dict.fromkeys(column_names))
+    return f"""(
+        SELECT "5-digit FIPS Code" AS fips_code, "Name", "State Abbreviation", {casts}
+        FROM county_health
+    )"""
+
+
+def _load_health_variables(columns: List[Tuple[str, str]]) -> List[Dict[str, str]]:
+    """Get list of available health variables for the given county_health columns, with metadata."""
     try:
         db = get_db()
         with db.get_cursor() as conn:
-            # Get all columns from county_health table
-            result = conn.execute("DESCRIBE county_health").fetchall()
-            
             # Get metadata if available
             metadata_result = conn.execute("""
                 SELECT variable_code, display_name, description, units, data_type, raw_variable
@@ -54,7 +427,7 @@ def get_health_variables() -> List[Dict[str, str]]:
                 logger.warning("No firearm metadata found")
             
             variables = []
-            for row in result:
+            for row in columns:
                 col_name = row[0]  # First column is the name
                 col_type = row[1]  # Second column is the type
                 
@@ -90,13 +463,19 @@ def get_health_variables() -> List[Dict[str, str]]:
         raise Exception(f"Failed to retrieve variables: {str(e)}")
 
 
+def get_variable_info(variable: str) -> Optional[Dict[str, str]]:
+    """Get the metadata entry for a variable name, or None if it is unknown."""
+    get_health_variables()  # Make sure the variable cache is loaded
+    return _VAR_INFO.get(variable)
+
+
 def validate_variable(variable: str) -> str:
     """Validate and return the actual column name for a variable."""
-    variables = get_health_variables()
-    var_map = {v["name"]: v["column"] for v in variables}
+    get_health_variables()  # Make sure the variable cache is loaded
+    column_name = _VAR_MAP.get(variable)
     
-    if variable not in var_map:
-        available_vars = list(var_map.keys())[:10]  # Show first 10
+    if column_name is None:
+        available_vars = list(_VAR_MAP.keys())[:10]  # Show first 10
         raise HTTPException(
             status_code=400,
             detail={
@@ -106,30 +485,28 @@ def validate_variable(variable: str) -> str:
             }
         )
     
-    return var_map[variable]
+    return column_name
 
 
 @router.get("/debug/columns")
-async def debug_columns():
+def debug_columns():
     """Debug endpoint to see all columns."""
     try:
-        db = get_db()
-        with db.get_cursor() as conn:
-            result = conn.execute("DESCRIBE county_health").fetchall()
-            columns = [{"name": col[0], "type": col[1]} for col in result]
-            raw_value_cols = [col for col in columns if "raw value" in col["name"]]
-            return {
-                "total_columns": len(columns),
-                "raw_value_columns": len(raw_value_cols),
-                "first_10_raw_value": raw_value_cols[:10],
-                "sample_columns": columns[:10]
-            }
+        get_health_variables()  # Make sure the column cache is loaded
+        columns = [{"name": name, "type": col_type} for name, col_type in _COLUMNS_CACHE]
+        raw_value_cols = [col for col in columns if "raw value" in col["name"]]
+        return {
+            "total_columns": len(columns),
+            "raw_value_columns": len(raw_value_cols),
+            "first_10_raw_value": raw_value_cols[:10],
+            "sample_columns": columns[:10]
+        }
     except Exception as e:
         logger.error(f"Debug error: {e}")
         return {"error": str(e)}
 
 @router.get("/vars")
-async def get_variables():
+def get_variables():
     """Get list of available variables and metadata."""
     try:
         variables = get_health_variables()
@@ -143,39 +520,11 @@ async def get_variables():
 
 
 @router.get("/variables/categories")
-async def get_variable_categories():
+def get_variable_categories():
     """Get variables grouped by health domain."""
     try:
-        variables = get_health_variables()
-        
-        # Group variables by category based on common themes
-        categories = {
-            "mortality": [],
-            "behavioral": [],
-            "clinical": [],
-            "social": [],
-            "physical_environment": [],
-            "demographics": []
-        }
-        
-        for var in variables:
-            name = var["display_name"].lower()
-            description = var.get("description", "").lower()
-            
-            if any(term in name for term in ["death", "mortality", "life expectancy", "fatalities", "suicide"]):
-                categories["mortality"].append(var)
-            elif any(term in name for term in ["smoking", "drinking", "obesity", "physical inactivity"]):
-                categories["behavioral"].append(var)
-            elif any(term in name for term in ["health days", "diabetes", "hiv", "mental", "distress"]):
-                categories["clinical"].append(var)
-            elif any(term in name for term in ["income", "poverty", "education", "unemployment", "housing", "associations"]):
-                categories["social"].append(var)
-            elif any(term in name for term in ["air pollution", "water", "housing", "climate", "environment"]):
-                categories["physical_environment"].append(var)
-            else:
-                categories["demographics"].append(var)
-        
-        return categories
+        get_health_variables()  # Make sure the variable cache is loaded
+        return Response(content=_CATEGORIES_BODY, media_type="application/json")
         
     except Exception as e:
         logger.error(f"Error in get_variable_categories: {e}")
@@ -183,88 +532,42 @@ async def get_variable_categories():
 
 
 @router.get("/stats")
-async def get_variable_stats(var: str = Query(..., description="Variable name")):
+def get_variable_stats(var: str = Query(..., description="Variable name")):
     """Get summary statistics for a health variable."""
     try:
         # Validate variable and get column name
         column_name = validate_variable(var)
         
         # Get variable metadata for context
-        variables = get_health_variables()
-        variable_info = next((v for v in variables if v["name"] == var), None)
+        variable_info = get_variable_info(var)
+        
+        # (count, mean, std, min, max, median), computed with the variable cache;
+        # columns without a single non-NULL value have no entry
+        result = _STATS_CACHE.get(column_name)
+        
+        if not result:
+            raise HTTPException(status_code=404, detail="No data found for variable")
+        
+        # Smart unit and description detection
+        smart_units, smart_description = _smart_units(var, _STATS_EXACT_UNITS, _STATS_UNIT_RULES)
+        
+        # Format the response with metadata
+        response = {
+            "variable": var,
+            "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
+            "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
+            "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
+            "data_type": variable_info["data_type"] if variable_info else "numeric",
+            "count": int(result[0]) if result[0] else 0,
+            "mean": round(float(result[1]), 2) if result[1] else None,
+            "std": round(float(result[2]), 2) if result[2] else None,
+            "min": round(float(result[3]), 2) if result[3] else None,
+            "max": round(float(result[4]), 2) if result[4] else None,
+            "median": round(float(result[5]), 2) if result[5] else None
+        }
+        
+        return response
         
-        db = get_db()
-        with db.get_cursor() as conn:
-            # Get statistics with proper casting for numeric operations
-            result = conn.execute(f"""
-                SELECT 
-                    COUNT(CASE WHEN "{column_name}" IS NOT NULL AND "{column_name}" != '' 
-                              AND "{column_name}" ~ '^[0-9.]+$' THEN 1 END) as count,
-                    AVG(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as mean,
-                    STDDEV(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                                THEN CAST("{column_name}" AS DOUBLE) END) as std,
-                    MIN(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as min,
-                    MAX(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as max,
-                    MEDIAN(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                                THEN CAST("{column_name}" AS DOUBLE) END) as median
-                FROM county_health
-                WHERE "{column_name}" IS NOT NULL
-            """).fetchone()
-            
-            if not result:
-                raise HTTPException(status_code=404, detail="No data found for variable")
-            
-            # Smart unit and description detection
-            smart_units = ""
-            smart_description = ""
-            if var == 'premature_death':
-                smart_units = "years lost per 100,000"
-                smart_description = "Years of potential life lost before age 75 per 100,000 population (age-adjusted)"
-            elif var == 'hiv_prevalence':
-                smart_units = "per 100,000 population"
-                smart_description = "Number of people aged 13 years and older living with a diagnosis of HIV per 100,000 population"
-            elif 'health_days' in var:
-                smart_units = "days per month"
-                smart_description = "Average number of unhealthy days reported in past 30 days (age-adjusted)"
-            elif var == 'traffic_volume':
-                smart_units = "vehicles per meter per day"
-                smart_description = "Average daily traffic volume per meter of road length"
-            elif var in ['firearm_fatalities', 'drug_overdose_deaths'] or ('death' in var and 'premature' not in var) or 'mortality' in var:
-                smart_units = "per 100,000 population"
-                smart_description = "Population-standardized rate for fair comparison"
-            elif 'climate' in var or 'adverse_climate' in var:
-                smart_units = "0-3 categories"
-                smart_description = "Climate threshold categories met (heat, drought, disasters)"
-            elif 'obesity' in var or 'smoking' in var or 'physical_inactivity' in var:
-                smart_units = "percentage"
-                smart_description = "Percentage of adult population"
-            elif 'income' in var or 'poverty' in var:
-                smart_units = "dollars" if 'income' in var else "percentage"
-                smart_description = "Economic indicator"
-            elif 'education' in var:
-                smart_units = "percentage"
-                smart_description = "Educational attainment indicator"
-            
-            # Format the response with metadata
-            response = {
-                "variable": var,
-                "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
-                "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
-                "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
-                "data_type": variable_info["data_type"] if variable_info else "numeric",
-                "count": int(result[0]) if result[0] else 0,
-                "mean": round(float(result[1]), 2) if result[1] else None,
-                "std": round(float(result[2]), 2) if result[2] else None,
-                "min": round(float(result[3]), 2) if result[3] else None,
-                "max": round(float(result[4]), 2) if result[4] else None,
-                "median": round(float(result[5]), 2) if result[5] else None
-            }
-            
-            return response
-            
     except HTTPException:
         raise
     except Exception as e:
@@ -273,123 +576,75 @@ async def get_variable_stats(var: str = Query(..., description="Variable name"))
 
 
 @router.get("/stats/transformed")
-async def get_transformed_variable_stats(var: str = Query(..., description="Variable name")):
+def get_transformed_variable_stats(var: str = Query(..., description="Variable name")):
     """Get summary statistics for a health variable with proper transformations applied."""
     try:
         # Validate variable and get column name
         column_name = validate_variable(var)
         
         # Get variable metadata for context
-        variables = get_health_variables()
-        variable_info = next((v for v in variables if v["name"] == var), None)
+        variable_info = get_variable_info(var)
         
-        db = get_db()
-        with db.get_cursor() as conn:
-            # Get statistics with proper casting for numeric operations
-            result = conn.execute(f"""
-                SELECT 
-                    COUNT(CASE WHEN "{column_name}" IS NOT NULL AND "{column_name}" != '' 
-                              AND "{column_name}" ~ '^[0-9.]+$' THEN 1 END) as count,
-                    AVG(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as mean,
-                    STDDEV(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                                THEN CAST("{column_name}" AS DOUBLE) END) as std,
-                    MIN(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as min,
-                    MAX(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                             THEN CAST("{column_name}" AS DOUBLE) END) as max,
-                    MEDIAN(CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                                THEN CAST("{column_name}" AS DOUBLE) END) as median
-                FROM county_health
-                WHERE "{column_name}" IS NOT NULL
-            """).fetchone()
-            
-            if not result:
-                raise HTTPException(status_code=404, detail="No data found for variable")
-            
-            # Define transformation logic (matching frontend metadata.js)
-            def transform_value(value, var_name):
-                # Variables that need decimal to percentage conversion
-                percentage_vars = [
-                    'unemployment', 'adult_obesity', 'adult_smoking', 'physical_inactivity',
-                    'mammography_screening', 'flu_vaccinations', 'children_in_poverty'
-                ]
-                
-                if value is None:
-                    return None
-                    
-                if var_name in percentage_vars:
-                    return float(value) * 100  # Convert decimal to percentage
-                
-                return float(value)
-            
-            # Smart unit and description detection with transformation awareness
-            smart_units = ""
-            smart_description = ""
-            
-            # Check if this variable needs percentage transformation
+        # (count, mean, std, min, max, median), computed with the variable cache;
+        # columns without a single non-NULL value have no entry
+        result = _STATS_CACHE.get(column_name)
+        
+        if not result:
+            raise HTTPException(status_code=404, detail="No data found for variable")
+        
+        # Define transformation logic (matching frontend metadata.js)
+        def transform_value(value, var_name):
+            # Variables that need decimal to percentage conversion
             percentage_vars = [
                 'unemployment', 'adult_obesity', 'adult_smoking', 'physical_inactivity',
                 'mammography_screening', 'flu_vaccinations', 'children_in_poverty'
             ]
             
-            if var == 'premature_death':
-                smart_units = "years lost per 100,000"
-                smart_description = "Years of potential life lost before age 75 per 100,000 population (age-adjusted)"
-            elif var == 'hiv_prevalence':
-                smart_units = "per 100,000 population"
-                smart_description = "Number of people aged 13 years and older living with a diagnosis of HIV per 100,000 population"
-            elif var in percentage_vars:
-                smart_units = "percentage"
-                if var == 'unemployment':
-                    smart_description = "Percentage of population ages 16 and older unemployed but seeking work"
-                elif var == 'mammography_screening':
-                    smart_description = "Percentage of female Medicare enrollees ages 65-74 who received an annual mammography screening"
-                elif var == 'adult_obesity':
-                    smart_description = "Percentage of adults aged 20 and older with obesity (BMI ≥ 30)"
-                else:
-                    smart_description = "Percentage value (transformed from decimal)"
-            elif 'health_days' in var:
-                smart_units = "days per month"
-                smart_description = "Average number of unhealthy days reported in past 30 days (age-adjusted)"
-            elif var == 'traffic_volume':
-                smart_units = "vehicles per meter per day"
-                smart_description = "Average daily traffic volume per meter of road length"
-            elif var in ['firearm_fatalities', 'drug_overdose_deaths'] or ('death' in var and 'premature' not in var) or 'mortality' in var:
-                smart_units = "per 100,000 population"
-                smart_description = "Population-standardized rate for fair comparison"
-            elif 'climate' in var or 'adverse_climate' in var:
-                smart_units = "0-3 categories"
-                smart_description = "Climate threshold categories met (heat, drought, disasters)"
-            
-            # Apply transformations to statistics
-            transformed_stats = {
-                "count": int(result[0]) if result[0] else 0,
-                "mean": transform_value(result[1], var),
-                "std": transform_value(result[2], var),
-                "min": transform_value(result[3], var),
-                "max": transform_value(result[4], var),
-                "median": transform_value(result[5], var)
-            }
-            
-            # Format the response with metadata
-            response = {
-                "variable": var,
-                "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
-                "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
-                "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
-                "data_type": variable_info["data_type"] if variable_info else "numeric",
-                "transformed": var in percentage_vars,
-                **transformed_stats
-            }
-            
-            # Round values for display
-            for key in ['mean', 'std', 'min', 'max', 'median']:
-                if response[key] is not None:
-                    response[key] = round(response[key], 2)
-            
-            return response
+            if value is None:
+                return None
+                
+            if var_name in percentage_vars:
+                return float(value) * 100  # Convert decimal to percentage
             
+            return float(value)
+        
+        # Check if this variable needs percentage transformation
+        percentage_vars = [
+            'unemployment', 'adult_obesity', 'adult_smoking', 'physical_inactivity',
+            'mammography_screening', 'flu_vaccinations', 'children_in_poverty'
+        ]
+        
+        # Smart unit and description detection with transformation awareness
+        smart_units, smart_description = _smart_units(var, _TRANSFORMED_EXACT_UNITS, _TRANSFORMED_UNIT_RULES)
+        
+        # Apply transformations to statistics
+        transformed_stats = {
+            "count": int(result[0]) if result[0] else 0,
+            "mean": transform_value(result[1], var),
+            "std": transform_value(result[2], var),
+            "min": transform_value(result[3], var),
+            "max": transform_value(result[4], var),
+            "median": transform_value(result[5], var)
+        }
+        
+        # Format the response with metadata
+        response = {
+            "variable": var,
+            "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
+            "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
+            "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
+            "data_type": variable_info["data_type"] if variable_info else "numeric",
+            "transformed": var in percentage_vars,
+            **transformed_stats
+        }
+        
+        # Round values for display
+        for key in ['mean', 'std', 'min', 'max', 'median']:
+            if response[key] is not None:
+                response[key] = round(response[key], 2)
+        
+        return response
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -397,145 +652,130 @@ async def get_transformed_variable_stats(var: str = Query(..., description="Vari
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
 
 
+def _cached_json_response(request: Request, body: bytes, gzipped: bytes, etag: str) -> Response:
+    """Serve a pre-encoded JSON body, honoring If-None-Match and gzip."""
+    # Data only changes when the ETL reruns; let browsers reuse a response
+    # briefly, then revalidate it against the ETag
+    headers = {"ETag": etag, "Vary": "Accept-Encoding", "Cache-Control": "public, max-age=300"}
+    
+    if_none_match = request.headers.get("if-none-match", "")
+    if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    
+    if accepts_gzip(request.headers.get("accept-encoding", "")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzipped, media_type="application/json", headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/choropleth")
-async def get_choropleth(var: str = Query(..., description="Variable name")):
+def get_choropleth(request: Request, var: str = Query(..., description="Variable name")):
     """Get choropleth data for a health variable."""
+    # Serve repeat requests from the already encoded response
+    with _CHOROPLETH_CACHE_LOCK:
+        cached = _CHOROPLETH_CACHE.get(var)
+        if cached is not None:
+            _CHOROPLETH_CACHE.move_to_end(var)
+    
+    if cached is not None:
+        return _cached_json_response(request, *cached)
+    
     try:
         # Validate variable and get column name
         column_name = validate_variable(var)
         
         # Get variable metadata
-        variables = get_health_variables()
-        variable_info = next((v for v in variables if v["name"] == var), None)
+        variable_info = get_variable_info(var)
+        
+        # Geometries are serialized once and shared between requests
+        geometries = get_county_geometries()
         
         db = get_db()
-        with db.get_cursor() as conn:
-            # Use direct table join since view may not exist
-            result = conn.execute(f"""
-                SELECT 
-                    h."5-digit FIPS Code" as fips_code,
-                    h."Name" as county_name,
-                    h."State Abbreviation" as state_name,
-                    CASE WHEN h."{column_name}" ~ '^[0-9.]+$' 
-                         THEN CAST(h."{column_name}" AS DOUBLE) END as value,
-                    ST_AsGeoJSON(s.geometry) as geometry_json
-                FROM county_health h
-                INNER JOIN county_spatial s ON h."5-digit FIPS Code" = s.fips_code
-                WHERE s.geometry IS NOT NULL
-                  AND h."{column_name}" IS NOT NULL
-                  AND h."{column_name}" != ''
-                  AND h."{column_name}" ~ '^[0-9.]+$'
-                ORDER BY h."5-digit FIPS Code"
-            """).fetchall()
-            
-            if not result:
-                raise HTTPException(status_code=404, detail="No valid data found for choropleth")
-            
-            # Calculate quantile breaks for classification
-            values = [row[3] for row in result if row[3] is not None]
-            
-            if not values:
-                raise HTTPException(status_code=404, detail="No valid numeric data for choropleth")
-            
-            # Sort values for quantile calculation
-            sorted_values = sorted(values)
-            n = len(sorted_values)
-            
-            if n < 5:
-                # Not enough data for proper quantiles
-                breaks = [min(values), max(values)]
-            else:
-                # Calculate quantile breaks (quintiles)
-                breaks = [
-                    sorted_values[0],  # min
-                    sorted_values[max(0, int(n * 0.2) - 1)],  # 20th percentile
-                    sorted_values[max(0, int(n * 0.4) - 1)],  # 40th percentile
-                    sorted_values[max(0, int(n * 0.6) - 1)],  # 60th percentile
-                    sorted_values[max(0, int(n * 0.8) - 1)],  # 80th percentile
-                    sorted_values[-1]   # max
-                ]
-                # Remove duplicates and sort
-                breaks = sorted(list(set(breaks)))
-            
-            # Assign classes based on breaks
-            def get_class(value):
-                if value is None:
-                    return None
-                for i in range(len(breaks) - 1):
-                    if value <= breaks[i + 1]:
-                        return i + 1
-                return len(breaks) - 1
-            
-            # Build GeoJSON
-            features = []
-            for row in result:
-                fips_code, county_name, state_name, value, geometry_json = row
-                
-                # Parse the geometry JSON
-                try:
-                    import json
-                    geometry = json.loads(geometry_json) if geometry_json else None
-                except Exception as e:
-                    logger.warning(f"Failed to parse geometry for county {fips_code}: {e}")
-                    continue
-                
-                if not geometry:
-                    continue
-                
-                feature = {
-                    "type": "Feature",
-                    "properties": {
-                        "fips": fips_code,
-                        "county_name": county_name,
-                        "state_name": state_name,
-                        "value": value,
-                        "class": get_class(value)
-                    },
-                    "geometry": geometry
-                }
-                features.append(feature)
+        # Fetch as column arrays; only counties with a geometry are mapped
+        columns = db.query_columns(f"""
+            SELECT 
+                fips_code,
+                "Name" as county_name,
+                "State Abbreviation" as state_name,
+                "{column_name}" as value
+            FROM {_numeric_source(column_name)}
+            WHERE "{column_name}" IS NOT NULL
+              AND fips_code IN (SELECT fips_code FROM county_spatial WHERE geometry IS NOT NULL)
+            ORDER BY fips_code
+        """)
+        values = columns["value"]
+        
+        if not len(values):
+            raise HTTPException(status_code=404, detail="No valid data found for choropleth")
+        
+        # Breaks only depend on the variable, so compute them once
+        breaks = _BREAKS_CACHE.get(column_name)
+        if breaks is None:
+            breaks = _BREAKS_CACHE[column_name] = _quantile_breaks(values)
+        
+        # Assign classes based on breaks
+        classes = _classify(values, breaks).tolist()
+        
+        # Build GeoJSON
+        features = []
+        for fips_code, county_name, state_name, value, value_class in zip(
+            columns["fips_code"].tolist(), columns["county_name"].tolist(),
+            columns["state_name"].tolist(), values.tolist(), classes
+        ):
+            geometry = geometries.get(fips_code)
+            if not geometry:
+                continue
             
-            # Smart unit detection for metadata
-            smart_units = ""
-            smart_description = ""
-            if var == 'premature_death':
-                smart_units = "years lost per 100,000"
-                smart_description = "Years of potential life lost before age 75 per 100,000 population (age-adjusted)"
-            elif var == 'hiv_prevalence':
-                smart_units = "per 100,000 population"
-                smart_description = "Number of people aged 13 years and older living with a diagnosis of HIV per 100,000 population"
-            elif var in ['firearm_fatalities', 'drug_overdose_deaths'] or ('death' in var and 'premature' not in var) or 'mortality' in var:
-                smart_units = "per 100,000 population"
-                smart_description = "Population-standardized rate"
-            elif 'climate' in var:
-                smart_units = "0-3 categories"
-                smart_description = "Climate threshold categories met"
-            elif 'obesity' in var or 'smoking' in var:
-                smart_units = "percentage"
-                smart_description = "Percentage of adult population"
-
-            # Prepare response with metadata
-            response = {
-                "type": "FeatureCollection",
-                "features": features,
-                "metadata": {
-                    "variable": var,
-                    "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
-                    "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
-                    "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
-                    "data_type": variable_info["data_type"] if variable_info else "numeric",
-                    "total_features": len(features),
-                    "class_breaks": breaks,
-                    "value_range": {
-                        "min": min(values),
-                        "max": max(values),
-                        "count": len(values)
-                    }
+            feature = {
+                "type": "Feature",
+                "properties": {
+                    "fips": fips_code,
+                    "county_name": county_name,
+                    "state_name": state_name,
+                    "value": value,
+                    "class": value_class
+                },
+                "geometry": geometry
+            }
+            features.append(feature)
+        
+        # Smart unit detection for metadata
+        smart_units, smart_description = _smart_units(var, _EXACT_UNITS, _CHOROPLETH_UNIT_RULES)
+
+        # Prepare response with metadata
+        response = {
+            "type": "FeatureCollection",
+            "features": features,
+            "metadata": {
+                "variable": var,
+                "display_name": variable_info["display_name"] if variable_info else var.replace("_", " ").title(),
+                "description": variable_info["description"] if (variable_info and variable_info["description"]) else smart_description,
+                "units": variable_info["units"] if (variable_info and variable_info["units"]) else smart_units,
+                "data_type": variable_info["data_type"] if variable_info else "numeric",
+                "total_features": len(features),
+                "class_breaks": breaks,
+                "value_range": {
+                    "min": float(values.min()),
+                    "max": float(values.max()),
+                    "count": len(values)
                 }
             }
-            
-            return response
-            
+        }
+        
+        # Encode directly: orjson splices in the geometry fragments, skipping
+        # FastAPI's generic encoder walking every coordinate. Compress once
+        # here so cached hits never gzip again
+        body = OrjsonResponse(response).body
+        entry = (body, gzip.compress(body, compresslevel=CHOROPLETH_GZIP_LEVEL), f'W/"{hashlib.sha256(body).hexdigest()}"')
+        
+        with _CHOROPLETH_CACHE_LOCK:
+            _CHOROPLETH_CACHE[var] = entry
+            if len(_CHOROPLETH_CACHE) > CHOROPLETH_CACHE_SIZE:
+                _CHOROPLETH_CACHE.popitem(last=False)
+        
+        return _cached_json_response(request, *entry)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -543,8 +783,39 @@ async def get_choropleth(var: str = Query(..., description="Variable name")):
         raise HTTPException(status_code=500, detail=f"Failed to get choropleth data: {str(e)}")
 
 
+def _quantile_breaks(values: np.ndarray) -> List[float]:
+    """Quintile class breaks (min, 20th, 40th, 60th, 80th percentile, max) without duplicates."""
+    n = len(values)
+    
+    if n < 5:
+        # Not enough data for proper quantiles
+        return [float(values.min()), float(values.max())]
+    
+    # The k-th smallest value for k = floor(n * q), found by partial sort
+    positions = [0, *(max(0, int(n * q) - 1) for q in (0.2, 0.4, 0.6, 0.8)), n - 1]
+    breaks = np.partition(values, positions)[positions]
+    
+    # Remove duplicates and sort
+    return np.unique(breaks).tolist()
+
+
+def _classify(values: np.ndarray, breaks: List[float]) -> np.ndarray:
+    """Class (1-based) of each value: the first break interval whose upper bound is >= the value."""
+    classes = np.searchsorted(breaks[1:], values, side="left") + 1
+    return np.minimum(classes, len(breaks) - 1)
+
+
+def _pearson_p_value(r: float, n: int) -> float:
+    """Two-sided p-value for a Pearson correlation r over n pairs."""
+    if abs(r) >= 1.0:
+        return 0.0
+    
+    t_stat = r * np.sqrt((n - 2) / (1.0 - r * r))
+    return float(2 * stats.t.sf(abs(t_stat), n - 2))
+
+
 @router.get("/corr")
-async def get_correlation(vars: str = Query(..., description="Comma-separated variable names")):
+def get_correlation(vars: str = Query(..., description="Comma-separated variable names")):
     """Get correlation between two variables."""
     try:
         var_list = [v.strip() for v in vars.split(",")]
@@ -558,35 +829,24 @@ async def get_correlation(vars: str = Query(..., description="Comma-separated va
         col1 = validate_variable(var1)
         col2 = validate_variable(var2)
         
-        db = get_db()
-        with db.get_cursor() as conn:
-            # Get paired data
-            result = conn.execute(f"""
-                SELECT 
-                    "{col1}" as var1_value,
-                    "{col2}" as var2_value
-                FROM counties_with_geometry
-                WHERE geometry IS NOT NULL 
-                  AND "{col1}" IS NOT NULL AND "{col1}" != '' AND "{col1}" ~ '^[0-9.]+$'
-                  AND "{col2}" IS NOT NULL AND "{col2}" != '' AND "{col2}" ~ '^[0-9.]+$'
-            """).fetchall()
-            
-            if len(result) < 10:  # Need minimum data points
-                raise HTTPException(status_code=400, detail="Insufficient valid data for correlation")
-            
-            # Extract values and calculate correlation
-            values1 = [float(row[0]) for row in result]
-            values2 = [float(row[1]) for row in result]
-            
-            correlation, p_value = pearsonr(values1, values2)
-            
-            return {
-                "var1": var1,
-                "var2": var2,
-                "correlation": round(correlation, 3),
-                "p_value": round(p_value, 6),
-                "n": len(values1)
-            }
+        # Every pair is computed when the variable cache loads
+        i, j = _CORR_INDEX[col1], _CORR_INDEX[col2]
+        n = int(_CORR_COUNTS[i, j])
+        
+        if n < 10:  # Need minimum data points
+            raise HTTPException(status_code=400, detail="Insufficient valid data for correlation")
+        
+        # NaN when either variable is constant
+        correlation = float(_CORR_MATRIX[i, j])
+        p_value = _pearson_p_value(correlation, n)
+        
+        return {
+            "var1": var1,
+            "var2": var2,
+            "correlation": round(correlation, 3),
+            "p_value": round(p_value, 6),
+            "n": n
+        }
             
     except HTTPException:
         raise
@@ -596,7 +856,7 @@ async def get_correlation(vars: str = Query(..., description="Comma-separated va
 
 
 @router.get("/counties/{fips}")
-async def get_county_details(fips: str):
+def get_county_details(fips: str):
     """Get individual county details."""
     try:
         if len(fips) != 5 or not fips.isdigit():
@@ -605,23 +865,26 @@ async def get_county_details(fips: str):
                 detail="FIPS code must be exactly 5 digits"
             )
         
+        get_health_variables()
+        
         db = get_db()
         with db.get_cursor() as conn:
-            # Get county details
+            # Get county details; the casts are no-ops once the ETL stores raw
+            # values as DOUBLE and cover databases that still hold strings
             result = conn.execute(f"""
                 SELECT 
                     "5-digit FIPS Code" as fips,
                     "Name" as county_name,
                     "State Abbreviation" as state,
-                    "Premature Death raw value" as premature_death,
-                    "Adult Obesity raw value" as obesity,
-                    "Adult Smoking raw value" as smoking,
-                    "Physical Inactivity raw value" as physical_inactivity,
-                    "Median Household Income raw value" as median_income,
-                    ST_AsGeoJSON(geometry) as geometry_json
+                    TRY_CAST("Premature Death raw value" AS DOUBLE) as premature_death,
+                    TRY_CAST("Adult Obesity raw value" AS DOUBLE) as obesity,
+                    TRY_CAST("Adult Smoking raw value" AS DOUBLE) as smoking,
+                    TRY_CAST("Physical Inactivity raw value" AS DOUBLE) as physical_inactivity,
+                    TRY_CAST("Median Household Income raw value" AS DOUBLE) as median_income,
+                    ST_AsGeoJSON({_GEOMETRY_COLUMN}) as geometry_json
                 FROM counties_with_geometry
-                WHERE "5-digit FIPS Code" = '{fips}'
-            """).fetchone()
+                WHERE "5-digit FIPS Code" = ?
+            """, [fips]).fetchone()
             
             if not result:
                 raise HTTPException(
@@ -637,8 +900,8 @@ async def get_county_details(fips: str):
             geometry = None
             if result[8]:
                 try:
-                    geometry = json.loads(result[8])
-                except json.JSONDecodeError:
+                    geometry = orjson.loads(result[8])
+                except orjson.JSONDecodeError:
                     pass
             
             return {
@@ -663,7 +926,7 @@ async def get_county_details(fips: str):
 
 
 @router.get("/neighbors/{fips}")
-async def get_county_neighbors(fips: str):
+def get_county_neighbors(fips: str):
     """Get spatial neighbors for local analysis."""
     try:
         if len(fips) != 5 or not fips.isdigit():
@@ -672,24 +935,42 @@ async def get_county_neighbors(fips: str):
                 detail="FIPS code must be exactly 5 digits"
             )
         
-        db = get_db()
-        with db.get_cursor() as conn:
+        # Make sure the table flags are loaded
+        get_health_variables()
+        
+        if _HAS_NEIGHBORS_TABLE:
+            # Adjacency precomputed by the ETL: an indexed lookup
+            query = """
+                SELECT 
+                    c."5-digit FIPS Code" as fips,
+                    c."Name" as county_name,
+                    c."State Abbreviation" as state
+                FROM county_neighbors n
+                JOIN counties_with_geometry c ON c."5-digit FIPS Code" = n.neighbor_fips
+                WHERE n.fips_code = $fips
+                ORDER BY c."Name"
+            """
+        else:
             # Find neighboring counties using spatial touches
-            result = conn.execute(f"""
+            query = """
                 WITH target_county AS (
                     SELECT geometry, "Name" as target_name
                     FROM counties_with_geometry 
-                    WHERE "5-digit FIPS Code" = '{fips}'
+                    WHERE "5-digit FIPS Code" = $fips
                 )
                 SELECT 
                     c."5-digit FIPS Code" as fips,
                     c."Name" as county_name,
                     c."State Abbreviation" as state
                 FROM counties_with_geometry c, target_county t
-                WHERE c."5-digit FIPS Code" != '{fips}'
+                WHERE c."5-digit FIPS Code" != $fips
                   AND ST_Touches(c.geometry, t.geometry)
                 ORDER BY c."Name"
-            """).fetchall()
+            """
+        
+        db = get_db()
+        with db.get_cursor() as conn:
+            result = conn.execute(query, {"fips": fips}).fetchall()
             
             neighbors = []
             for row in result:
@@ -710,75 +991,114 @@ async def get_county_neighbors(fips: str):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+# Neighbors per county in the Moran's I spatial weights
+MORAN_K = 8
+
+
+@lru_cache(maxsize=8)
+def _knn_weights(fips: Tuple[str, ...]) -> Tuple[sparse.csr_matrix, float, float]:
+    """
+    Build row-standardized KNN spatial weights for counties in this order.
+    
+    Returns the sparse weights matrix with its S1 and S2 sums, which the
+    Moran's I variance needs and which depend only on the weights.
+    """
+    # Look up the cached centroids; every county passed in has a geometry
+    centroid_fips, centroids = get_county_centroids()
+    lon, lat = np.radians(centroids[np.searchsorted(centroid_fips, fips)]).T
+    n = len(lon)
+    
+    # Place centroids on the unit sphere: straight-line (chord) distance
+    # there grows with great-circle distance, so nearest neighbors in 3D are
+    # the great-circle nearest neighbors, unlike in raw lon/lat degrees
+    points = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    
+    # Query one extra neighbor and drop each county itself; where duplicate
+    # points push a county out of its own list, drop the farthest instead
+    _, indices = cKDTree(points).query(points, k=MORAN_K + 1)
+    not_self = indices != np.arange(n)[:, None]
+    not_self[not_self.sum(axis=1) == MORAN_K + 1, -1] = False
+    neighbors = indices[not_self].reshape(n, MORAN_K)
+    
+    w = sparse.csr_matrix(
+        (np.full(n * MORAN_K, 1.0 / MORAN_K), (np.repeat(np.arange(n), MORAN_K), neighbors.ravel())),
+        shape=(n, n)
+    )
+    
+    s1 = 0.5 * (w + w.T).power(2).sum()
+    s2 = float(((np.asarray(w.sum(axis=1)) + np.asarray(w.sum(axis=0)).T) ** 2).sum())
+    return w, s1, s2
+
+
+def _moran_statistics(
+    values: np.ndarray, w: sparse.csr_matrix, s1: float, s2: float
+) -> Tuple[float, float, float, float]:
+    """
+    Moran's I with its moments under the normality assumption.
+    
+    Args:
+        values: Variable values, in the same order as the weights rows
+        w: Row-standardized spatial weights, so S0 = n
+        s1: S1 sum of the weights
+        s2: S2 sum of the weights
+        
+    Returns:
+        Tuple of (I, E[I], Var[I], z-score)
+    """
+    n = len(values)
+    z = values - values.mean()
+    moran_i = (z @ (w @ z)) / (z @ z)
+    expected_i = -1.0 / (n - 1)
+    variance = (n * n * s1 - n * s2 + 3 * n * n) / ((n - 1) * (n + 1) * n * n) - expected_i ** 2
+    z_score = (moran_i - expected_i) / np.sqrt(variance)
+    return moran_i, expected_i, variance, z_score
+
+
 @router.get("/moran")
-async def get_moran_i(var: str = Query(..., description="Variable name")):
+def get_moran_i(var: str = Query(..., description="Variable name")):
     """Calculate Moran's I spatial autocorrelation statistic."""
     try:
         column_name = validate_variable(var)
         
-        # Import PySAL for spatial statistics
-        try:
-            from libpysal import weights
-            from esda import Moran
-        except ImportError:
+        db = get_db()
+        # Get county data for counties with a geometry, as column arrays
+        columns = db.query_columns(f"""
+            SELECT 
+                h.fips_code as fips,
+                h."{column_name}" as value
+            FROM {_numeric_source(column_name)} h
+            INNER JOIN county_spatial s ON h.fips_code = s.fips_code
+            WHERE s.geometry IS NOT NULL
+              AND h."{column_name}" IS NOT NULL
+            ORDER BY h.fips_code
+        """)
+        values = columns["value"]
+        
+        if len(values) < 50:  # Need sufficient data for spatial analysis
             raise HTTPException(
-                status_code=500,
-                detail="Spatial statistics not available - PySAL not properly installed"
+                status_code=400,
+                detail="Insufficient data for spatial autocorrelation analysis"
             )
         
-        db = get_db()
-        with db.get_cursor() as conn:
-            # Get county data with centroids for spatial weights
-            result = conn.execute(f"""
-                SELECT 
-                    "5-digit FIPS Code" as fips,
-                    CASE WHEN "{column_name}" ~ '^[0-9.]+$' 
-                         THEN CAST("{column_name}" AS DOUBLE) 
-                         ELSE NULL END as value,
-                    ST_X(ST_Centroid(geometry)) as lon,
-                    ST_Y(ST_Centroid(geometry)) as lat
-                FROM counties_with_geometry
-                WHERE geometry IS NOT NULL 
-                  AND "{column_name}" IS NOT NULL 
-                  AND "{column_name}" != ''
-                  AND "{column_name}" ~ '^[0-9.]+$'
-                ORDER BY "5-digit FIPS Code"
-            """).fetchall()
-            
-            if len(result) < 50:  # Need sufficient data for spatial analysis
-                raise HTTPException(
-                    status_code=400,
-                    detail="Insufficient data for spatial autocorrelation analysis"
-                )
-            
-            # Extract coordinates and values
-            coords = [(row[2], row[3]) for row in result if row[1] is not None]
-            values = [row[1] for row in result if row[1] is not None]
-            
-            if len(values) < 50:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Insufficient valid numeric data for analysis"
-                )
-            
-            # Create spatial weights matrix (KNN with k=8)
-            w = weights.KNN.from_array(coords, k=8)
-            w.transform = 'r'  # Row standardization
-            
-            # Calculate Moran's I
-            moran = Moran(values, w)
-            
-            return {
-                "variable": var,
-                "moran_i": round(moran.I, 4),
-                "expected_i": round(moran.EI, 4),
-                "variance": round(moran.VI_norm, 6),
-                "z_score": round(moran.z_norm, 4),
-                "p_value": round(moran.p_norm, 6),
-                "n": len(values),
-                "interpretation": "positive" if moran.I > moran.EI else "negative" if moran.I < moran.EI else "random"
-            }
-            
+        # Spatial weights depend only on which counties have a value, so
+        # variables with the same coverage share one matrix
+        w, s1, s2 = _knn_weights(tuple(columns["fips"]))
+        
+        n = len(values)
+        moran_i, expected_i, variance, z_score = _moran_statistics(values, w, s1, s2)
+        p_value = 2 * stats.norm.sf(abs(z_score))
+        
+        return {
+            "variable": var,
+            "moran_i": round(float(moran_i), 4),
+            "expected_i": round(expected_i, 4),
+            "variance": round(float(variance), 6),
+            "z_score": round(float(z_score), 4),
+            "p_value": round(float(p_value), 6),
+            "n": n,
+            "interpretation": "positive" if moran_i > expected_i else "negative" if moran_i < expected_i else "random"
+        }
+        
     except HTTPException:
         raise
     except Exception as e:
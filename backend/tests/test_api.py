@@ -9,8 +9,18 @@ Tests API contracts and endpoint responses as specified in testing-strategy.md:
 """
 
 import pytest
+import statistics
+import sys
 import time
+import numpy as np
+import orjson
 from fastapi import status
+from fastapi.testclient import TestClient
+from scipy import sparse
+
+from backend.app.encoding import accepts_gzip
+from backend.app.main import JSONGZipMiddleware
+from backend.app.routes import api
 
 
 class TestHealthVariablesAPI:
@@ -57,24 +67,20 @@ class TestHealthVariablesAPI:
 class TestStatisticsAPI:
     """Test statistics API endpoints."""
     
-    def test_stats_endpoint_valid_variable(self, test_client):
+    def test_stats_endpoint_valid_variable(self, test_client, available_variables):
         """Test /api/stats endpoint with valid variable."""
-        # First get available variables
-        vars_response = test_client.get("/api/vars")
-        if vars_response.status_code == 200:
-            variables = vars_response.json().get("variables", [])
-            if variables:
-                var_name = variables[0]["name"]
-                
-                response = test_client.get(f"/api/stats?var={var_name}")
-                assert response.status_code == 200
-                
-                data = response.json()
-                required_fields = ["variable", "count", "mean", "std", "min", "max"]
-                for field in required_fields:
-                    assert field in data, f"Missing field '{field}' in stats response"
-                
-                assert data["variable"] == var_name
+        if available_variables:
+            var_name = available_variables[0]["name"]
+            
+            response = test_client.get(f"/api/stats?var={var_name}")
+            assert response.status_code == 200
+            
+            data = response.json()
+            required_fields = ["variable", "count", "mean", "std", "min", "max"]
+            for field in required_fields:
+                assert field in data, f"Missing field '{field}' in stats response"
+            
+            assert data["variable"] == var_name
     
     def test_stats_endpoint_invalid_variable(self, test_client):
         """Test /api/stats endpoint with invalid variable returns 400."""
@@ -89,6 +95,16 @@ class TestStatisticsAPI:
         assert "details" in data
         assert data["status"] == 400
     
+    @pytest.mark.parametrize("path", ["/api/stats", "/api/stats/transformed"])
+    def test_stats_endpoint_no_data(self, test_client, available_variables, monkeypatch, path):
+        """Test a variable without any values returns 404 instead of empty stats."""
+        if available_variables:
+            var_name = available_variables[0]["name"]
+            monkeypatch.setattr(api, "_STATS_CACHE", {})
+            
+            response = test_client.get(f"{path}?var={var_name}")
+            assert response.status_code == 404
+    
     def test_stats_endpoint_missing_parameter(self, test_client):
         """Test /api/stats endpoint without var parameter."""
         response = test_client.get("/api/stats")
@@ -100,39 +116,53 @@ class TestStatisticsAPI:
 class TestChoroplethAPI:
     """Test choropleth API endpoint."""
     
-    def test_choropleth_endpoint_structure(self, test_client):
+    def test_choropleth_endpoint_structure(self, test_client, available_variables):
         """Test /api/choropleth endpoint response structure."""
-        # First get a valid variable
-        vars_response = test_client.get("/api/vars")
-        if vars_response.status_code == 200:
-            variables = vars_response.json().get("variables", [])
-            if variables:
-                var_name = variables[0]["name"]
+        if available_variables:
+            var_name = available_variables[0]["name"]
+            
+            response = test_client.get(f"/api/choropleth?var={var_name}")
+            
+            if response.status_code == 200:
+                # Several MB of GeoJSON; orjson decodes it much faster than json
+                data = orjson.loads(response.content)
                 
-                response = test_client.get(f"/api/choropleth?var={var_name}")
+                # Check GeoJSON structure
+                assert "type" in data
+                assert data["type"] == "FeatureCollection"
+                assert "features" in data  
+                assert isinstance(data["features"], list)
                 
-                if response.status_code == 200:
-                    data = response.json()
+                # If we have features, check their structure
+                if data["features"]:
+                    feature = data["features"][0]
+                    assert "type" in feature
+                    assert feature["type"] == "Feature"
+                    assert "properties" in feature
+                    assert "geometry" in feature
                     
-                    # Check GeoJSON structure
-                    assert "type" in data
-                    assert data["type"] == "FeatureCollection"
-                    assert "features" in data  
-                    assert isinstance(data["features"], list)
-                    
-                    # If we have features, check their structure
-                    if data["features"]:
-                        feature = data["features"][0]
-                        assert "type" in feature
-                        assert feature["type"] == "Feature"
-                        assert "properties" in feature
-                        assert "geometry" in feature
-                        
-                        # Check that properties include required fields
-                        props = feature["properties"]
-                        required_props = ["fips", "value", "class"]
-                        for prop in required_props:
-                            assert prop in props, f"Missing property '{prop}' in feature"
+                    # Check that properties include required fields
+                    props = feature["properties"]
+                    required_props = ["fips", "value", "class"]
+                    for prop in required_props:
+                        assert prop in props, f"Missing property '{prop}' in feature"
+    
+    def test_choropleth_bypasses_gzip_middleware(self):
+        """Test the gzip middleware leaves /api/choropleth to encode itself."""
+        body = b"x" * 4096
+        
+        async def plain_app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200,
+                        "headers": [(b"content-type", b"application/json")]})
+            await send({"type": "http.response.body", "body": body})
+        
+        client = TestClient(JSONGZipMiddleware(plain_app, minimum_size=1024))
+        choropleth = client.get("/api/choropleth", headers={"Accept-Encoding": "gzip"})
+        other = client.get("/api/stats", headers={"Accept-Encoding": "gzip"})
+        
+        assert "content-encoding" not in choropleth.headers
+        assert choropleth.content == body
+        assert other.headers["content-encoding"] == "gzip"
     
     def test_choropleth_endpoint_invalid_variable(self, test_client):
         """Test /api/choropleth endpoint with invalid variable."""
@@ -150,30 +180,26 @@ class TestChoroplethAPI:
 class TestCorrelationAPI:
     """Test correlation API endpoint."""
     
-    def test_correlation_endpoint_valid_variables(self, test_client):
+    def test_correlation_endpoint_valid_variables(self, test_client, available_variables):
         """Test /api/corr endpoint with valid variables."""
-        # Get available variables
-        vars_response = test_client.get("/api/vars")
-        if vars_response.status_code == 200:
-            variables = vars_response.json().get("variables", [])
-            if len(variables) >= 2:
-                var1 = variables[0]["name"]
-                var2 = variables[1]["name"] 
+        if len(available_variables) >= 2:
+            var1 = available_variables[0]["name"]
+            var2 = available_variables[1]["name"] 
+            
+            response = test_client.get(f"/api/corr?vars={var1},{var2}")
+            
+            if response.status_code == 200:
+                data = response.json()
                 
-                response = test_client.get(f"/api/corr?vars={var1},{var2}")
+                # Check response structure
+                required_fields = ["var1", "var2", "correlation"]
+                for field in required_fields:
+                    assert field in data, f"Missing field '{field}' in correlation response"
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Check response structure
-                    required_fields = ["var1", "var2", "correlation"]
-                    for field in required_fields:
-                        assert field in data, f"Missing field '{field}' in correlation response"
-                    
-                    # Check correlation value bounds
-                    corr = data["correlation"]
-                    if corr is not None:
-                        assert -1.0 <= corr <= 1.0, f"Correlation {corr} outside valid range [-1, 1]"
+                # Check correlation value bounds
+                corr = data["correlation"]
+                if corr is not None:
+                    assert -1.0 <= corr <= 1.0, f"Correlation {corr} outside valid range [-1, 1]"
     
     def test_correlation_endpoint_invalid_format(self, test_client):
         """Test /api/corr endpoint with invalid parameter format."""
@@ -215,51 +241,134 @@ class TestCountyAPI:
 class TestSpatialAnalysisAPI:
     """Test spatial analysis API endpoints."""
     
-    def test_moran_i_endpoint(self, test_client):
+    def test_moran_i_endpoint(self, test_client, available_variables):
         """Test /api/moran endpoint."""
-        # Get a valid variable
-        vars_response = test_client.get("/api/vars")
-        if vars_response.status_code == 200:
-            variables = vars_response.json().get("variables", [])
-            if variables:
-                var_name = variables[0]["name"]
+        if available_variables:
+            var_name = available_variables[0]["name"]
+            
+            response = test_client.get(f"/api/moran?var={var_name}")
+            
+            if response.status_code == 200:
+                data = response.json()
                 
-                response = test_client.get(f"/api/moran?var={var_name}")
+                # Check response structure
+                required_fields = ["variable", "morans_i"]
+                for field in required_fields:
+                    assert field in data, f"Missing field '{field}' in Moran's I response"
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    # Check response structure
-                    required_fields = ["variable", "morans_i"]
-                    for field in required_fields:
-                        assert field in data, f"Missing field '{field}' in Moran's I response"
-                    
-                    # Check Moran's I bounds
-                    morans_i = data["morans_i"]
-                    if morans_i is not None:
-                        assert -1.0 <= morans_i <= 1.0, f"Moran's I {morans_i} outside valid range [-1, 1]"
+                # Check Moran's I bounds
+                morans_i = data["morans_i"]
+                if morans_i is not None:
+                    assert -1.0 <= morans_i <= 1.0, f"Moran's I {morans_i} outside valid range [-1, 1]"
+
+    
+    @pytest.mark.parametrize("values, expected_i, z_score", [
+        # Alternating values: every neighbor pair differs, I = -1, z = -sqrt(5)
+        ([1.0, 0.0, 1.0, 0.0], -1.0, -5 ** 0.5),
+        # z = [-1.5, -0.5, 0.5, 1.5], z.Wz = -1, z.z = 5, I = -0.2, z = 1/sqrt(5)
+        ([1.0, 2.0, 3.0, 4.0], -0.2, 5 ** -0.5),
+    ])
+    def test_moran_statistics_reference(self, values, expected_i, z_score):
+        """Test Moran's I against hand-computed values on a four-county ring."""
+        # Each county neighbors the two next to it, row-standardized to 1/2:
+        # S1 = 0.5 * 8 * (1/2 + 1/2)^2 = 4, S2 = 4 * (1 + 1)^2 = 16
+        w = sparse.csr_matrix(np.array([
+            [0.0, 0.5, 0.0, 0.5],
+            [0.5, 0.0, 0.5, 0.0],
+            [0.0, 0.5, 0.0, 0.5],
+            [0.5, 0.0, 0.5, 0.0],
+        ]))
+        
+        moran_i, expected, variance, z = api._moran_statistics(np.array(values), w, 4.0, 16.0)
+        
+        # E[I] = -1/(n-1); Var[I] = (16*4 - 4*16 + 3*16) / (15*16) - 1/9 = 4/45
+        assert moran_i == pytest.approx(expected_i)
+        assert expected == pytest.approx(-1 / 3)
+        assert variance == pytest.approx(4 / 45)
+        assert z == pytest.approx(z_score)
+    
+    def test_refresh_resets_spatial_caches(self, test_client, available_variables):
+        """Test that refreshing the variable cache drops geometries, centroids and weights."""
+        if not available_variables:
+            pytest.skip("No variables in the database")
+        
+        test_client.get(f"/api/moran?var={available_variables[0]['name']}")
+        api.get_county_geometries()
+        assert api._GEOM_CACHE is not None
+        assert api._CENTROID_CACHE is not None
+        assert api._knn_weights.cache_info().currsize > 0
+        
+        api.refresh_variable_cache()
+        
+        assert api._GEOM_CACHE is None
+        assert api._CENTROID_CACHE is None
+        assert api._knn_weights.cache_info().currsize == 0
 
 
+def _median_ms(call, iterations: int = 20) -> float:
+    """Median wall time of ``call()`` in milliseconds, after one warm-up call."""
+    # Warm up caches so only steady-state latency is measured
+    call()
+    
+    timings_ns = []
+    for _ in range(iterations):
+        start_time = time.perf_counter_ns()
+        call()
+        timings_ns.append(time.perf_counter_ns() - start_time)
+    
+    return statistics.median(timings_ns) / 1e6
+
+
+@pytest.mark.perf
+@pytest.mark.skipif(sys.gettrace() is not None, reason="timings are meaningless under a tracer (coverage, debugger)")
 class TestAPIPerformance:
     """Test API performance requirements."""
     
     def test_api_response_time(self, test_client):
-        """Test that API responses are under 150ms as specified in PRD."""
+        """Test that median API responses are under 150ms as specified in PRD."""
         endpoints_to_test = [
             "/api/vars",
             "/api/variables/categories"
         ]
         
         for endpoint in endpoints_to_test:
-            start_time = time.time()
-            response = test_client.get(endpoint)
-            end_time = time.time()
+            assert test_client.get(endpoint).status_code == 200
             
-            response_time_ms = (end_time - start_time) * 1000
+            response_time_ms = _median_ms(lambda: test_client.get(endpoint))
             
-            # Allow for some test overhead, use 500ms threshold for tests
-            assert response_time_ms < 500, \
-                f"Response time {response_time_ms:.2f}ms for {endpoint} exceeds 500ms test threshold"
+            assert response_time_ms < 150, \
+                f"Median response time {response_time_ms:.2f}ms for {endpoint} exceeds 150ms"
+    
+    def test_handler_time(self, test_client):
+        """Test handler time without HTTP and ASGI overhead, to track regressions in the handlers themselves."""
+        # test_client has run the app lifespan, so the database is initialized
+        handlers_to_test = [
+            api.get_variables,
+            api.get_variable_categories
+        ]
+        
+        for handler in handlers_to_test:
+            handler_time_ms = _median_ms(handler)
+            
+            assert handler_time_ms < 150, \
+                f"Median handler time {handler_time_ms:.2f}ms for {handler.__name__} exceeds 150ms"
+
+
+class TestContentEncoding:
+    """Test Accept-Encoding parsing shared by the API and the dev server."""
+    
+    @pytest.mark.parametrize("accept_encoding, expected", [
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("GZIP; q=1.0", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.0, br", False),
+        ("br, deflate", False),
+        ("", False),
+    ])
+    def test_accepts_gzip(self, accept_encoding, expected):
+        """Test gzip is refused when absent or given q=0."""
+        assert accepts_gzip(accept_encoding) is expected
 
 
 class TestAPIErrorHandling:
@@ -294,4 +403,25 @@ class TestAPIErrorHandling:
         if response.status_code == 200:
             assert "database" in data
             assert "health_records" in data
-            assert "spatial_records" in data 
\ No newline at end of file
+            assert "spatial_records" in data 
+
+class TestRootRoutes:
+    """Test the API descriptor and the frontend mount."""
+    
+    def test_root_returns_api_info(self, test_client):
+        """Test / still returns the JSON API descriptor."""
+        response = test_client.get("/")
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["docs"] == "/docs"
+        assert data["frontend"] == "/app/"
+    
+    def test_frontend_hides_gzip_copies(self, test_client):
+        """Test /app/ serves the page but not the dev server's .gz copies."""
+        response = test_client.get("/app/")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/html")
+        
+        response = test_client.get("/app/index.html.gz")
+        assert response.status_code == 404
@@ -9,6 +9,10 @@ Tests data pipeline integrity as specified in testing-strategy.md:
 - Spatial join integrity
 """
 
+import json
+import os
+import shutil
+
 import pytest
 
 
@@ -45,17 +49,63 @@ class TestETLDataLoading:
         """Test creation of joined view with health and spatial data."""
         etl = loaded_test_etl
         
-        # Verify joined view exists and has correct count
+        # Verify joined view exists, has correct count and geometry is present
         with etl.db.get_cursor() as conn:
-            result = conn.execute("SELECT COUNT(*) FROM counties_with_geometry").fetchone()
-            assert result[0] == 5, "Joined view should have 5 records"
-            
-            # Verify geometry is present
+            total, with_geometry = conn.execute("""
+                SELECT COUNT(*), COUNT(geometry) FROM counties_with_geometry
+            """).fetchone()
+            assert total == 5, "Joined view should have 5 records"
+            assert with_geometry == 5, "All records should have geometry"
+
+
+    def test_joined_table_requires_geometry(self, fresh_etl, sample_health_csv, sample_spatial_geojson, tmp_path):
+        """Test that health rows without a county shape are left out of the joined table."""
+        csv_path = tmp_path / "health.csv"
+        shutil.copy(sample_health_csv, csv_path)
+        with open(csv_path, "a") as f:
+            # State-level row, as in the full County Health Rankings CSV
+            f.write("\n01000,Alabama,Alabama,8500,33.0,18.5")
+        
+        fresh_etl.load_county_health_data(str(csv_path))
+        fresh_etl.load_spatial_data(sample_spatial_geojson)
+        fresh_etl.create_joined_view()
+        
+        with fresh_etl.db.get_cursor() as conn:
             result = conn.execute("""
-                SELECT COUNT(*) FROM counties_with_geometry 
-                WHERE geometry IS NOT NULL
+                SELECT COUNT(*), COUNT(*) FILTER (WHERE fips_code = '01000')
+                FROM counties_with_geometry
             """).fetchone()
-            assert result[0] == 5, "All records should have geometry"
+            assert result == (5, 0)
+    
+    @pytest.mark.parametrize("use_st_read", [True, False])
+    def test_simplified_geometry(self, fresh_etl, tmp_path, monkeypatch, use_st_read):
+        """Test that every county gets a simplified geometry with fewer vertices, with either reader."""
+        monkeypatch.setattr(fresh_etl, "_st_read_supported", lambda path: use_st_read)
+        
+        # A 0.1 degree square whose edges carry many nearly collinear points
+        edge = [(-86.5 + i * 0.005, 32.5 + (i % 2) * 0.0005) for i in range(21)]
+        ring = edge + [(-86.4, 32.6), (-86.5, 32.6), edge[0]]
+        geojson_path = tmp_path / "dense_counties.json"
+        geojson_path.write_text(json.dumps({
+            "type": "FeatureCollection",
+            "features": [{
+                "type": "Feature",
+                "properties": {"GEOID": "01001", "NAME": "Autauga County", "STATEFP": "01"},
+                "geometry": {"type": "Polygon", "coordinates": [ring]}
+            }]
+        }))
+        
+        fresh_etl.load_spatial_data(str(geojson_path))
+        
+        with fresh_etl.db.get_cursor() as conn:
+            missing, full_points, simplified_points = conn.execute("""
+                SELECT COUNT(*) - COUNT(geometry_simplified),
+                       SUM(ST_NPoints(geometry)),
+                       SUM(ST_NPoints(geometry_simplified))
+                FROM county_spatial
+            """).fetchone()
+            assert missing == 0, "Every county should have a simplified geometry"
+            assert simplified_points < full_points
 
 
 class TestETLDataIntegrity:
@@ -94,22 +144,15 @@ class TestETLDataIntegrity:
         etl = loaded_test_etl
         
         with etl.db.get_cursor() as conn:
-            # Check for null geometries after join
-            result = conn.execute("""
-                SELECT COUNT(*) FROM counties_with_geometry 
-                WHERE geometry IS NULL
+            # Count null geometries after join and invalid ones (via spatial
+            # functions) in one scan
+            null_geometries, invalid_geometries = conn.execute("""
+                SELECT COUNT(*) - COUNT(geometry),
+                       COUNT(*) FILTER (WHERE NOT ST_IsValid(geometry))
+                FROM counties_with_geometry
             """).fetchone()
             
-            null_geometries = result[0] if result else 0
             assert null_geometries == 0, f"Found {null_geometries} null geometries"
-            
-            # Check geometry validity using spatial functions
-            result = conn.execute("""
-                SELECT COUNT(*) FROM counties_with_geometry 
-                WHERE NOT ST_IsValid(geometry)
-            """).fetchone()
-            
-            invalid_geometries = result[0] if result else 0
             assert invalid_geometries == 0, f"Found {invalid_geometries} invalid geometries"
     
     def test_spatial_join_completeness(self, loaded_test_etl):
@@ -158,31 +201,109 @@ class TestETLDataValidation:
         etl = loaded_test_etl
         
         with etl.db.get_cursor() as conn:
-            # Test premature death values (should be positive)
-            result = conn.execute("""
-                SELECT MIN(CAST("Premature death raw value" AS DOUBLE)) as min_val,
-                       MAX(CAST("Premature death raw value" AS DOUBLE)) as max_val
+            # Both ranges in one scan; non-numeric entries cast to NULL and are skipped
+            death_min, death_max, obesity_min, obesity_max = conn.execute("""
+                SELECT MIN(TRY_CAST("Premature death raw value" AS DOUBLE)),
+                       MAX(TRY_CAST("Premature death raw value" AS DOUBLE)),
+                       MIN(TRY_CAST("Adult obesity raw value" AS DOUBLE)),
+                       MAX(TRY_CAST("Adult obesity raw value" AS DOUBLE))
                 FROM county_health
-                WHERE regexp_full_match(CAST("Premature death raw value" AS VARCHAR), '^[0-9.]+$')
             """).fetchone()
             
-            if result and result[0] is not None:
-                min_val, max_val = result
-                assert min_val > 0, f"Premature death minimum value {min_val} should be positive"
-                assert max_val < 50000, f"Premature death maximum value {max_val} seems too high"
+            # Test premature death values (should be positive)
+            if death_min is not None:
+                assert death_min > 0, f"Premature death minimum value {death_min} should be positive"
+                assert death_max < 50000, f"Premature death maximum value {death_max} seems too high"
             
             # Test obesity percentages (should be 0-100)
+            if obesity_min is not None:
+                assert 0 <= obesity_min <= 100, f"Obesity percentage {obesity_min} should be 0-100"
+                assert 0 <= obesity_max <= 100, f"Obesity percentage {obesity_max} should be 0-100"
+
+    
+    def test_numeric_table_types(self, loaded_test_etl):
+        """Test that raw values are materialized as DOUBLE columns."""
+        etl = loaded_test_etl
+        
+        with etl.db.get_cursor() as conn:
+            column_types = dict(conn.execute("""
+                SELECT column_name, data_type FROM duckdb_columns()
+                WHERE table_name = 'county_health_numeric'
+            """).fetchall())
+            
+            assert column_types["fips_code"] == "VARCHAR"
+            assert column_types["Premature death raw value"] == "DOUBLE"
+            assert column_types["Adult obesity raw value"] == "DOUBLE"
+            
             result = conn.execute("""
-                SELECT MIN(CAST("Adult obesity raw value" AS DOUBLE)) as min_val,
-                       MAX(CAST("Adult obesity raw value" AS DOUBLE)) as max_val  
-                FROM county_health
-                WHERE regexp_full_match(CAST("Adult obesity raw value" AS VARCHAR), '^[0-9.]+$')
+                SELECT COUNT(*), SUM("Premature death raw value")
+                FROM county_health_numeric
             """).fetchone()
+            assert result == (5, 40728.0)
+    
+    def test_joined_table_types(self, loaded_test_etl):
+        """Test that the joined table holds raw values as DOUBLE, like the numeric table."""
+        etl = loaded_test_etl
+        
+        with etl.db.get_cursor() as conn:
+            column_types = dict(conn.execute("""
+                SELECT column_name, data_type FROM duckdb_columns()
+                WHERE table_name = 'counties_with_geometry'
+            """).fetchall())
             
-            if result and result[0] is not None:
-                min_val, max_val = result
-                assert 0 <= min_val <= 100, f"Obesity percentage {min_val} should be 0-100"
-                assert 0 <= max_val <= 100, f"Obesity percentage {max_val} should be 0-100"
+            assert column_types["5-digit FIPS Code"] == "VARCHAR"
+            assert column_types["Premature death raw value"] == "DOUBLE"
+            assert column_types["Adult obesity raw value"] == "DOUBLE"
+    
+    def test_neighbors_table(self, loaded_test_etl):
+        """Test that county adjacency is materialized as FIPS pairs."""
+        etl = loaded_test_etl
+        
+        with etl.db.get_cursor() as conn:
+            columns = [row[0] for row in conn.execute("DESCRIBE county_neighbors").fetchall()]
+            assert columns == ["fips_code", "neighbor_fips"]
+            
+            # The sample county squares are all disjoint
+            result = conn.execute("SELECT COUNT(*) FROM county_neighbors").fetchone()
+            assert result[0] == 0
+
+
+class TestETLIncrementalLoading:
+    """Test that unchanged source files are not reloaded."""
+    
+    def test_unchanged_source_skipped(self, fresh_etl, sample_health_csv, tmp_path):
+        """Test that a source file is only reloaded when its content changes."""
+        csv_path = tmp_path / "health.csv"
+        shutil.copy(sample_health_csv, csv_path)
+        assert fresh_etl.load_county_health_data(str(csv_path)) == 5
+        
+        # Reloading the table would bring back the deleted row
+        with fresh_etl.db.get_cursor() as conn:
+            conn.execute("DELETE FROM county_health WHERE fips_code = '01009'")
+        assert fresh_etl.load_county_health_data(str(csv_path)) == 4
+        
+        # A newer mtime alone is not a change; the content hash still matches
+        stat = csv_path.stat()
+        os.utime(csv_path, (stat.st_atime, stat.st_mtime + 60))
+        assert fresh_etl.load_county_health_data(str(csv_path)) == 4
+        
+        with open(csv_path, "a") as f:
+            f.write("\n01011,Bullock County,Alabama,9123,38.5,20.2")
+        assert fresh_etl.load_county_health_data(str(csv_path)) == 6
+    
+    def test_changed_spatial_source_reloaded(self, fresh_etl, sample_spatial_geojson, tmp_path):
+        """Test that the spatial table is skipped when unchanged and reloaded when edited."""
+        geojson_path = tmp_path / "counties.json"
+        shutil.copy(sample_spatial_geojson, geojson_path)
+        assert fresh_etl.load_spatial_data(str(geojson_path)) == 5
+        
+        with fresh_etl.db.get_cursor() as conn:
+            conn.execute("DELETE FROM county_spatial WHERE fips_code = '01009'")
+        assert fresh_etl.load_spatial_data(str(geojson_path)) == 4
+        
+        # Same features, different bytes
+        geojson_path.write_text(geojson_path.read_text() + "\n")
+        assert fresh_etl.load_spatial_data(str(geojson_path)) == 5
 
 
 class TestETLFullPipeline:
@@ -211,6 +332,41 @@ class TestETLFullPipeline:
         assert validation['duplicate_fips'] == 0
         assert validation['join_success_rate'] == 100.0
 
+    
+    def test_full_etl_cache(self, fresh_etl, sample_health_csv, sample_spatial_geojson, tmp_path):
+        """Test that a rerun with unchanged inputs is a cache hit and changed inputs rerun the ETL."""
+        csv_path = tmp_path / "health.csv"
+        geojson_path = tmp_path / "counties.json"
+        shutil.copy(sample_health_csv, csv_path)
+        shutil.copy(sample_spatial_geojson, geojson_path)
+        
+        def completed_at():
+            with fresh_etl.db.get_cursor() as conn:
+                return conn.execute("SELECT completed_at FROM etl_results WHERE id = 1").fetchone()[0]
+        
+        first = fresh_etl.run_full_etl(str(csv_path), str(geojson_path))
+        assert first['success'] is True
+        first_completed = completed_at()
+        
+        # Unchanged inputs: the stored results come back without running the ETL
+        second = fresh_etl.run_full_etl(str(csv_path), str(geojson_path))
+        assert second == first
+        assert completed_at() == first_completed
+        
+        # Touching a file without changing it is still a cache hit
+        stat = geojson_path.stat()
+        os.utime(geojson_path, (stat.st_atime, stat.st_mtime + 60))
+        fresh_etl.run_full_etl(str(csv_path), str(geojson_path))
+        assert completed_at() == first_completed
+        
+        # Changed content invalidates the cache and reloads
+        with open(csv_path, "a") as f:
+            f.write("\n01011,Bullock County,Alabama,9123,38.5,20.2")
+        third = fresh_etl.run_full_etl(str(csv_path), str(geojson_path))
+        assert third['success'] is True
+        assert third['health_rows_loaded'] == 6
+        assert completed_at() > first_completed
+
 
 # Performance and error handling tests
 class TestETLPerformance:
@@ -229,4 +385,6 @@ class TestETLPerformance:
     def test_spatial_functionality(self, test_etl):
         """Test that spatial functionality is working in test database."""
         assert test_etl.db.test_spatial_functionality() is True, \
+            "Spatial extension should be loaded in test database"
+        assert test_etl.db.test_spatial_functionality(deep_check=True) is True, \
             "Spatial functionality should work in test database" 
\ No newline at end of file
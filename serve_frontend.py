@@ -4,16 +4,59 @@ Simple development server for County Health Explorer frontend
 Serves static files and proxies API requests to backend
 """
 
+import argparse
+import datetime
+import email.utils
+import gzip
+import http.client
 import http.server
-import socketserver
+import os
+import queue
+import re
+import shutil
+import socket
+import stat
+import threading
 import urllib.request
-import urllib.parse
 import urllib.error
 import json
 import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from pathlib import Path
 
-def check_backend_health(backend_url="http://localhost:8000", timeout=5):
+from backend.app.encoding import accepts_gzip
+
+# Backend address, resolved once rather than parsed from a URL per request
+BACKEND_HOST = "localhost"
+BACKEND_PORT = 8000
+BACKEND_URL = f"http://{BACKEND_HOST}:{BACKEND_PORT}"
+
+# Read size when relaying backend responses to the browser
+PROXY_CHUNK_SIZE = 64 * 1024
+
+# Small, deterministic API responses are cached briefly so page reloads don't
+# round-trip to the backend (choropleth GeoJSON is cached by the backend itself)
+API_CACHE_TTL = 30
+API_CACHE_SIZE = 256
+
+# Methods that can be retried on a fresh backend connection
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+# Request headers not forwarded to the backend: hop-by-hop headers (RFC 7230),
+# Host and Content-Length (set by http.client), and Accept-Encoding so the
+# backend answers with an identity body the proxy can cache and relay as is
+_UNFORWARDED_HEADERS = {
+    "connection", "keep-alive", "proxy-connection", "te", "trailer",
+    "transfer-encoding", "upgrade", "host", "content-length", "accept-encoding",
+}
+
+# Static assets worth serving pre-gzipped
+PRECOMPRESS_SUFFIXES = {".html", ".css", ".js", ".json", ".svg"}
+
+_CACHEABLE_API_PATH = re.compile(r"^/api/(vars|variables/categories|stats|moran|corr|counties/|neighbors/)")
+
+def check_backend_health(backend_url=BACKEND_URL, timeout=5):
     """
     Check if the backend server is running and healthy
     
@@ -46,7 +89,7 @@ def check_backend_health(backend_url="http://localhost:8000", timeout=5):
     except Exception as e:
         return False, f"❌ Unexpected error checking backend: {e}"
 
-def wait_for_backend(backend_url="http://localhost:8000", max_wait=30):
+def wait_for_backend(backend_url=BACKEND_URL, max_wait=30):
     """
     Wait for backend to become available with a timeout
     
@@ -72,13 +115,144 @@ def wait_for_backend(backend_url="http://localhost:8000", max_wait=30):
     print(f"\n❌ Timeout: Backend server did not start within {max_wait} seconds")
     return False
 
+# Idle keep-alive connections to the backend, reused across proxied requests
+_backend_pool: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue(maxsize=16)
+
+def _acquire_backend_connection():
+    """Take an idle backend connection from the pool, or open a new one"""
+    try:
+        return _backend_pool.get_nowait()
+    except queue.Empty:
+        return http.client.HTTPConnection(BACKEND_HOST, BACKEND_PORT, timeout=60)
+
+def _release_backend_connection(conn):
+    """Return a backend connection to the pool, closing it if the pool is full"""
+    try:
+        _backend_pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+@contextmanager
+def backend_response(path, method="GET", body=None, headers=None):
+    """
+    Send a request to the backend over a pooled keep-alive connection
+    
+    Args:
+        path: Request path including the query string
+        method: HTTP method to forward
+        body: Request body, if any
+        headers: End-to-end request headers to forward
+        
+    Yields:
+        http.client.HTTPResponse: The unread backend response
+    """
+    idempotent = method in IDEMPOTENT_METHODS
+    # A pooled connection may have been closed by the backend while idle, and
+    # only idempotent requests can safely be retried on a fresh one
+    if idempotent:
+        conn = _acquire_backend_connection()
+    else:
+        conn = http.client.HTTPConnection(BACKEND_HOST, BACKEND_PORT, timeout=60)
+    try:
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+        except (http.client.HTTPException, ConnectionError):
+            if not idempotent:
+                raise
+            # The backend closed the idle connection; retry once on a fresh one
+            conn.close()
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+        yield response
+        # Drain anything left unread so the connection can be reused
+        response.read()
+    except Exception:
+        conn.close()
+        raise
+    
+    if response.will_close:
+        conn.close()
+    else:
+        _release_backend_connection(conn)
+
+_api_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_api_cache_lock = threading.Lock()
+
+def get_cached_api_response(path, allow_stale=False):
+    """
+    Look up a cached API response body
+    
+    Args:
+        path: Request path including the query string
+        allow_stale: Also return entries whose TTL has expired
+        
+    Returns:
+        bytes or None: The cached body, if any
+    """
+    with _api_cache_lock:
+        entry = _api_cache.get(path)
+        if entry is None:
+            return None
+        
+        expires, body = entry
+        if not allow_stale and expires < time.monotonic():
+            return None
+        
+        _api_cache.move_to_end(path)
+        return body
+
+def cache_api_response(path, body):
+    """Cache an API response body, evicting the least recently used entries"""
+    with _api_cache_lock:
+        _api_cache[path] = (time.monotonic() + API_CACHE_TTL, body)
+        _api_cache.move_to_end(path)
+        while len(_api_cache) > API_CACHE_SIZE:
+            _api_cache.popitem(last=False)
+
+def precompress_frontend(directory):
+    """
+    Write a gzipped copy next to each compressible static asset
+    
+    Copies are only rewritten when missing or older than their source.
+    
+    Args:
+        directory: Frontend directory to walk
+        
+    Returns:
+        int: Number of .gz files written
+    """
+    written = 0
+    for path in Path(directory).rglob("*"):
+        if path.suffix not in PRECOMPRESS_SUFFIXES or not path.is_file():
+            continue
+        
+        gz_path = path.with_name(path.name + ".gz")
+        if gz_path.exists() and gz_path.stat().st_mtime >= path.stat().st_mtime:
+            continue
+        
+        gz_path.write_bytes(gzip.compress(path.read_bytes(), compresslevel=9, mtime=0))
+        written += 1
+    return written
+
 class ProxyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     """HTTP request handler that proxies API calls to the backend"""
     
+    # Send small JSON responses immediately rather than waiting on Nagle's algorithm
+    disable_nagle_algorithm = True
+    
+    # Larger kernel send buffer for multi-megabyte choropleth responses
+    send_buffer_size = 1 << 20
+    
     def __init__(self, *args, **kwargs):
         # Set the directory to serve files from
         super().__init__(*args, directory="frontend", **kwargs)
     
+    def setup(self):
+        """Tune the client socket before the request is handled"""
+        self.request.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.send_buffer_size)
+        super().setup()
+    
     def do_GET(self):
         """Handle GET requests - proxy API calls, serve static files otherwise"""
         
@@ -89,37 +263,85 @@ class ProxyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             # Serve static files
             super().do_GET()
     
+    def proxy_or_reject(self):
+        """Handle other methods - proxy API calls, which are the only ones accepting them"""
+        if self.path.startswith('/api/'):
+            self.proxy_api_request()
+        else:
+            self.send_error(501, f"Unsupported method ({self.command!r})")
+    
+    do_POST = do_PUT = do_PATCH = do_DELETE = proxy_or_reject
+    
+    def do_OPTIONS(self):
+        """Answer CORS preflights here; end_headers already adds the policy"""
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        # Let browsers reuse the preflight result for a day
+        self.send_header('Access-Control-Max-Age', '86400')
+        self.end_headers()
+    
     def proxy_api_request(self):
         """Proxy API requests to the backend server"""
-        backend_url = f"http://localhost:8000{self.path}"
+        cacheable = self.command == 'GET' and _CACHEABLE_API_PATH.match(self.path) is not None
+        if cacheable:
+            cached = get_cached_api_response(self.path)
+            if cached is not None:
+                self.send_api_response(cached)
+                return
         
+        headers_sent = False
         try:
-            # Make request to backend
-            response = urllib.request.urlopen(backend_url)
-            data = response.read()
-            
-            # Set response headers
-            self.send_response(response.getcode())
-            self.send_header('Content-Type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else None
+            headers = {
+                name: value for name, value in self.headers.items()
+                if name.lower() not in _UNFORWARDED_HEADERS
+            }
             
-            # Send response data
-            self.wfile.write(data)
+            # Make request to backend
+            with backend_response(self.path, self.command, body, headers) as response:
+                if response.status >= 400:
+                    # Handle HTTP errors
+                    self.send_response(response.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    
+                    error_response = {
+                        "error": f"Backend error: {response.reason}",
+                        "status": response.status
+                    }
+                    self.wfile.write(json.dumps(error_response).encode())
+                    return
+                
+                if cacheable and response.status == 200:
+                    data = response.read()
+                    cache_api_response(self.path, data)
+                    self.send_api_response(data)
+                    return
+                
+                # Set response headers
+                self.send_response(response.status)
+                self.send_header('Content-Type', 'application/json')
+                content_length = response.getheader('Content-Length')
+                if content_length is not None:
+                    self.send_header('Content-Length', content_length)
+                self.end_headers()
+                headers_sent = True
+                
+                # Stream response data as it arrives instead of buffering it
+                shutil.copyfileobj(response, self.wfile, PROXY_CHUNK_SIZE)
             
-        except urllib.error.HTTPError as e:
-            # Handle HTTP errors
-            self.send_response(e.code)
-            self.send_header('Content-Type', 'application/json')
-            self.end_headers()
+        except Exception as e:
+            if headers_sent:
+                # Too late to send an error response; drop the connection
+                raise
             
-            error_response = {
-                "error": f"Backend error: {e.reason}",
-                "status": e.code
-            }
-            self.wfile.write(json.dumps(error_response).encode())
+            # Backend unreachable: an expired cache entry beats an error
+            stale = get_cached_api_response(self.path, allow_stale=True) if cacheable else None
+            if stale is not None:
+                self.send_api_response(stale)
+                return
             
-        except Exception as e:
             # Handle other errors
             self.send_response(500)
             self.send_header('Content-Type', 'application/json')
@@ -131,17 +353,124 @@ class ProxyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
             }
             self.wfile.write(json.dumps(error_response).encode())
     
+    def send_api_response(self, data):
+        """Send a complete 200 JSON response body"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def send_head(self):
+        """
+        Serve a static file with an ETag, answering matching revalidations with 304
+        
+        The precompressed .gz copy is sent when the client accepts gzip and the
+        copy is up to date. Directory listings and redirects are left to the base class.
+        """
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and self.path.split("?", 1)[0].endswith("/"):
+            path = os.path.join(path, "index.html")
+        
+        try:
+            source_stat = os.stat(path)
+        except OSError:
+            return super().send_head()
+        if not stat.S_ISREG(source_stat.st_mode):
+            return super().send_head()
+        
+        serve_path, encoding = path, None
+        if accepts_gzip(self.headers.get("Accept-Encoding", "")):
+            try:
+                # Skip stale copies; the source was edited since it was compressed
+                if os.stat(path + ".gz").st_mtime >= source_stat.st_mtime:
+                    serve_path, encoding = path + ".gz", "gzip"
+            except OSError:
+                pass
+        
+        # The source's mtime and size identify its content; the suffix the encoding
+        etag = f'"{source_stat.st_mtime_ns:x}-{source_stat.st_size:x}{"-gz" if encoding else ""}"'
+        if self.not_modified(etag, source_stat.st_mtime):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return None
+        
+        try:
+            f = open(serve_path, "rb")
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        
+        try:
+            fs = os.fstat(f.fileno())
+            self.send_response(200)
+            self.send_header("Content-type", self.guess_type(path))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(fs.st_size))
+            self.send_header("Last-Modified", self.date_time_string(source_stat.st_mtime))
+            self.send_header("ETag", etag)
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+    
+    def not_modified(self, etag, mtime):
+        """
+        Check whether the client's cached copy is still current
+        
+        If-None-Match is compared against the ETag. Without it, If-Modified-Since
+        is compared against the file's mtime, as the base class does.
+        """
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if not if_modified_since:
+            return False
+        
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.timezone.utc)
+        
+        # Last-Modified is sent with one-second resolution
+        last_modified = datetime.datetime.fromtimestamp(mtime, datetime.timezone.utc).replace(microsecond=0)
+        return last_modified <= since
+    
+    def copyfile(self, source, outputfile):
+        """Send static files with sendfile(), without copying through Python"""
+        if outputfile is self.wfile:
+            # socket.sendfile falls back to plain send() where sendfile() isn't available
+            self.connection.sendfile(source)
+        else:
+            super().copyfile(source, outputfile)
+    
     def end_headers(self):
         """Add CORS headers to all responses"""
         self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, PUT, PATCH, DELETE, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
 
-def main():
-    """Start the development server with backend health check"""
-    port = 3000
-    backend_url = "http://localhost:8000"
+def main(port=3000, wait=None):
+    """
+    Start the development server with backend health check
+    
+    Args:
+        port: Port to serve the frontend on
+        wait: Whether to wait for a backend that isn't running yet;
+            None asks interactively
+    """
+    backend_url = BACKEND_URL
     
     # Check if frontend directory exists
     frontend_dir = Path("frontend")
@@ -150,6 +479,9 @@ def main():
         print("Make sure you're running this from the project root.")
         return
     
+    # Refresh gzipped copies of edited assets before serving
+    precompress_frontend(frontend_dir)
+    
     print("🏥 County Health Explorer - Development Server")
     print("=" * 50)
     
@@ -164,10 +496,12 @@ def main():
         print("   cd backend && uvicorn app.main:app --reload --port 8000")
         print()
         
-        # Ask user if they want to wait for backend
+        # Ask user if they want to wait for backend, unless decided on the command line
         try:
-            user_input = input("Would you like to wait for the backend to start? (y/N): ").strip().lower()
-            if user_input in ['y', 'yes']:
+            if wait is None:
+                user_input = input("Would you like to wait for the backend to start? (y/N): ").strip().lower()
+                wait = user_input in ['y', 'yes']
+            if wait:
                 if not wait_for_backend(backend_url, max_wait=60):
                     print("❌ Cannot start frontend without backend server")
                     return
@@ -191,7 +525,8 @@ def main():
     print("=" * 50)
     
     try:
-        with socketserver.TCPServer(("", port), ProxyHTTPRequestHandler) as httpd:
+        # One thread per request, so a slow API call doesn't hold up static files
+        with http.server.ThreadingHTTPServer(("", port), ProxyHTTPRequestHandler) as httpd:
             httpd.serve_forever()
     except KeyboardInterrupt:
         print("\n👋 Frontend server stopped")
@@ -203,4 +538,10 @@ def main():
             print(f"❌ Server error: {e}")
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Serve the County Health Explorer frontend and proxy /api to the backend")
+    parser.add_argument("--port", type=int, default=3000, help="Port to serve the frontend on (default: 3000)")
+    parser.add_argument("--wait", action=argparse.BooleanOptionalAction, default=None,
+                        help="Wait for the backend if it isn't running, instead of asking")
+    args = parser.parse_args()
+    
+    main(port=args.port, wait=args.wait) 
\ No newline at end of file
@@ -4,18 +4,83 @@ Development startup script for County Health Explorer
 Starts both backend and frontend servers with proper coordination
 """
 
+import socket
 import subprocess
 import time
 import sys
 import signal
 import os
+import queue
+import threading
 from pathlib import Path
 
+from serve_frontend import BACKEND_URL, check_backend_health
+
+# Seconds to wait for each server to start accepting requests
+STARTUP_TIMEOUT = 30
+
 def signal_handler(sig, frame):
     """Handle Ctrl+C gracefully"""
     print('\n👋 Shutting down servers...')
     sys.exit(0)
 
+def port_is_open(port, host="localhost"):
+    """Check whether something is accepting connections on a port"""
+    try:
+        with socket.create_connection((host, port), timeout=0.1):
+            return True
+    except OSError:
+        return False
+
+def wait_until_ready(process, is_ready, timeout=STARTUP_TIMEOUT):
+    """
+    Poll a readiness check until it passes
+    
+    Args:
+        process: Server process being started
+        is_ready: Callable returning True once the server accepts requests
+        timeout: Maximum time to wait in seconds
+        
+    Returns:
+        bool: True if the server became ready, False if it exited or timed out
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        if is_ready():
+            return True
+        time.sleep(0.05)
+    return False
+
+def wait_for_any_exit(processes):
+    """
+    Block until one of the server processes exits
+    
+    Each process is waited on in its own thread through Popen.wait(), so
+    subprocess reaps the child itself and keeps its real exit status.
+    
+    Args:
+        processes: List of (name, process) tuples
+        
+    Returns:
+        tuple: (name, returncode) of the server that exited
+    """
+    exited = queue.Queue()
+    for name, process in processes:
+        threading.Thread(
+            target=lambda name=name, process=process: exited.put((name, process.wait())),
+            daemon=True
+        ).start()
+    
+    # Wake up now and then so Ctrl+C is handled on Windows, where a blocking
+    # get() can't be interrupted
+    while True:
+        try:
+            return exited.get(timeout=1)
+        except queue.Empty:
+            pass
+
 def main():
     """Start both backend and frontend development servers"""
     
@@ -46,21 +111,14 @@ def main():
             "--host", "127.0.0.1"
         ]
         
-        backend_process = subprocess.Popen(
-            backend_cmd,
-            cwd="backend",
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True
-        )
+        # Children write straight to this terminal; an unread pipe would
+        # fill up and block the servers on their log output
+        backend_process = subprocess.Popen(backend_cmd, cwd="backend")
         processes.append(("Backend", backend_process))
         
-        # Wait a moment for backend to start
+        # Wait until the backend answers requests
         print("⏳ Waiting for backend to initialize...")
-        time.sleep(3)
-        
-        # Check if backend started successfully
-        if backend_process.poll() is not None:
+        if not wait_until_ready(backend_process, lambda: check_backend_health(BACKEND_URL, timeout=2)[0]):
             print("❌ Backend server failed to start")
             return
         
@@ -70,19 +128,11 @@ def main():
         
         # Start frontend server
         print("🌐 Starting frontend server...")
-        frontend_process = subprocess.Popen(
-            [sys.executable, "serve_frontend.py"],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            universal_newlines=True
-        )
+        frontend_process = subprocess.Popen([sys.executable, "serve_frontend.py"])
         processes.append(("Frontend", frontend_process))
         
-        # Wait a moment for frontend to start
-        time.sleep(2)
-        
-        # Check if frontend started successfully
-        if frontend_process.poll() is not None:
+        # Wait until the frontend server is listening
+        if not wait_until_ready(frontend_process, lambda: port_is_open(3000)):
             print("❌ Frontend server failed to start")
             return
         
@@ -95,15 +145,10 @@ def main():
         print("Press Ctrl+C to stop both servers")
         print("=" * 60)
         
-        # Keep the script running and monitor processes
-        while True:
-            time.sleep(1)
-            
-            # Check if any process has died
-            for name, process in processes:
-                if process.poll() is not None:
-                    print(f"❌ {name} server has stopped unexpectedly")
-                    return
+        # Keep the script running until either server exits
+        name, returncode = wait_for_any_exit(processes)
+        print(f"❌ {name} server has stopped unexpectedly (exit code {returncode})")
+        return
                     
     except KeyboardInterrupt:
         print("\n👋 Shutting down servers...")